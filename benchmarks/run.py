@@ -0,0 +1,304 @@
+"""
+Benchmarks for the targeting, placement and inference hot paths.
+
+Run from the repository root::
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --baseline bench.json   # exit 1 on regressions
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+
+import numpy as np
+from core.ai import (
+    _build_probability_grid,
+    _build_probability_grid_np,
+    get_computer_target,
+    get_computer_targets,
+)
+from core.bitboard import BoardState, mask_from_array
+from core.config import GameConfig
+from core.game_logic import place_opponent_ships, prune_sunk_hits, sample_fleet
+from core.opening_book import OpeningBook
+from core.simulator import play_game
+from core.targeting import TargetingState
+from ml.ml_model import get_model, predict_target
+
+SIZES = (5, 10, 20, 50)
+BATCH = 64
+FLEETS = {
+    "small": [3, 2],
+    "standard": [5, 4, 3, 3, 2],
+}
+
+
+# ----------------------------------------------------------------------------- #
+# Fixtures                                                                      #
+# ----------------------------------------------------------------------------- #
+def make_positions(config: GameConfig, count: int, seed: int):
+    """
+    Mid-game positions: a random fleet with a random share of cells fired at.
+    Returns ``(computer_guesses, live_hits, remaining_lengths)`` tuples.
+    """
+    grid_size = config.grid_size
+    rng = np.random.default_rng(seed)
+    positions = []
+    for _ in range(count):
+        fleet = BoardState.from_ships(
+            [
+                [divmod(int(i), grid_size) for i in cells]
+                for cells in sample_fleet(config, rng)
+            ],
+            grid_size,
+        )
+        fired = rng.random(grid_size * grid_size) < rng.uniform(0.0, 0.6)
+        guesses = fired.astype(int).reshape(grid_size, grid_size)
+        fleet.shots = mask_from_array(guesses)
+        if fleet.all_sunk():
+            continue
+        positions.append((guesses, fleet.live_hits(), fleet.remaining_lengths()))
+    return positions
+
+
+def make_game_moves(config: GameConfig, count: int, seed: int):
+    """
+    Heuristic self-play games, stopped once *count* moves are collected.
+    Each game is a list of ``(r, c, hit, sunk_cells, guesses, live_hits,
+    remaining_lengths)`` moves, the last four taken after the shot.
+    """
+    grid_size = config.grid_size
+    rng = np.random.default_rng(seed)
+    choice_rng = random.Random(seed)
+    games, total = [], 0
+    while total < count:
+        fleet = BoardState.from_ships(
+            [
+                [divmod(int(i), grid_size) for i in cells]
+                for cells in sample_fleet(config, rng)
+            ],
+            grid_size,
+        )
+        guesses = np.zeros((grid_size, grid_size), dtype=int)
+        hits: list[tuple[int, int]] = []
+        targeting = TargetingState(grid_size)
+        moves = []
+        while not fleet.all_sunk() and total < count:
+            r, c = get_computer_target(
+                hits, guesses, remaining_lengths=fleet.remaining_lengths(),
+                engine="incremental", state=targeting, rng=choice_rng,
+            )
+            guesses[r, c] = 1
+            ship = fleet.fire(r, c)
+            targeting.record_shot(r, c, ship is not None)
+            sunk = []
+            if ship is not None:
+                hits.append((r, c))
+                if fleet.is_sunk(ship):
+                    sunk = [cell for cell in fleet.ship_cells(ship) if cell in hits]
+                    prune_sunk_hits(hits, fleet, ship, targeting)
+            moves.append(
+                (r, c, ship is not None, sunk, guesses.copy(), list(hits), fleet.remaining_lengths())
+            )
+            total += 1
+        games.append(moves)
+    return games
+
+
+def _incremental_calls(games) -> list[Callable[[], object]]:
+    """Per move: feed the shot to a per-game state, then read the heat map."""
+    calls = []
+    for moves in games:
+        state = TargetingState(moves[0][4].shape[0])
+        for r, c, hit, sunk, _, _, remaining in moves:
+            def call(state=state, r=r, c=c, hit=hit, sunk=sunk, remaining=remaining):
+                state.record_shot(r, c, hit)
+                if sunk:
+                    state.record_sunk(sunk)
+                return state.probability_grid(remaining)
+            calls.append(call)
+    return calls
+
+
+def _batch_call(positions) -> Callable[[], object]:
+    """One :func:`get_computer_targets` call over stacked *positions*."""
+    guesses = np.stack([p[0] for p in positions])
+    hits = np.zeros(guesses.shape, dtype=bool)
+    for b, (_, live_hits, _) in enumerate(positions):
+        for r, c in live_hits:
+            hits[b, r, c] = True
+    fleets = [p[2] for p in positions]
+    return lambda: get_computer_targets(guesses, hits, fleets)
+
+
+# ----------------------------------------------------------------------------- #
+# Measurement                                                                   #
+# ----------------------------------------------------------------------------- #
+def measure(
+    calls: list[Callable[[], object]],
+    seed: int,
+    max_seconds: float,
+    alloc_calls: int = 5,
+) -> dict:
+    """Time each call once (until *max_seconds*), then trace a few for allocations."""
+    random.seed(seed)
+    np.random.seed(seed)
+
+    latencies = []
+    deadline = time.perf_counter() + max_seconds
+    for call in calls:
+        start = time.perf_counter_ns()
+        call()
+        latencies.append(time.perf_counter_ns() - start)
+        if time.perf_counter() > deadline:
+            break
+
+    peaks = []
+    tracemalloc.start()
+    for call in calls[:alloc_calls]:
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        call()
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    us = np.array(latencies) / 1000
+    return {
+        "calls": len(latencies),
+        "mean_us": float(us.mean()),
+        "p50_us": float(np.percentile(us, 50)),
+        "p90_us": float(np.percentile(us, 90)),
+        "p99_us": float(np.percentile(us, 99)),
+        "peak_alloc_kib": max(peaks) / 1024,
+        "calls_per_second": float(1e6 / us.mean()),
+    }
+
+
+def cases(grid_size: int, ship_lengths: list[int], n_positions: int, seed: int, games: int):
+    """Yield ``(name, calls)`` for one board size and fleet."""
+    config = GameConfig(grid_size, ship_lengths)
+    positions = make_positions(config, n_positions, seed)
+
+    if grid_size <= 20:
+        yield "grid.python", [
+            lambda p=p: _build_probability_grid(p[0], p[1], p[2]) for p in positions
+        ]
+    yield "grid.numpy", [
+        lambda p=p: _build_probability_grid_np(p[0], p[1], p[2]) for p in positions
+    ]
+    # Whole games, move by move: the incremental state's real workload.
+    played = make_game_moves(config, n_positions, seed)
+    yield "grid.numpy.game", [
+        lambda m=m: _build_probability_grid_np(m[4], m[5], m[6])
+        for moves in played for m in moves
+    ]
+    yield "grid.incremental.game", _incremental_calls(played)
+    yield "target.heuristic", [
+        lambda p=p: get_computer_target(p[1], p[0], grid_size, remaining_lengths=p[2])
+        for p in positions
+    ]
+    batches = [positions[i:i + BATCH] for i in range(0, len(positions), BATCH)]
+    yield f"target.batch{BATCH}", [_batch_call(chunk) for chunk in batches]
+    book = OpeningBook()
+    yield "target.book", [
+        lambda p=p: get_computer_target(
+            p[1], p[0], grid_size, remaining_lengths=p[2], book=book
+        )
+        for p in positions
+    ]
+    if grid_size <= 10:
+        yield "target.exact", [
+            lambda p=p: get_computer_target(
+                p[1], p[0], grid_size, remaining_lengths=p[2], mode="exact"
+            )
+            for p in positions[:20]
+        ]
+    yield "placement", [
+        lambda: place_opponent_ships(config)
+    ] * n_positions
+    if grid_size <= 20:
+        yield "game", [lambda: play_game(grid_size, ship_lengths)] * games
+    if grid_size == 5 and get_model() is not None:
+        yield "predict_target", [
+            lambda p=p: predict_target(p[0].ravel().tolist(), p[1], p[2]) for p in positions
+        ]
+
+
+def run(sizes, fleets, n_positions, games, seed, max_seconds) -> dict:
+    results = {}
+    for grid_size in sizes:
+        for fleet_name in fleets:
+            ship_lengths = FLEETS[fleet_name]
+            if max(ship_lengths) > grid_size or sum(ship_lengths) > grid_size**2 // 2:
+                continue
+            for name, calls in cases(grid_size, ship_lengths, n_positions, seed, games):
+                key = f"{name}/{grid_size}x{grid_size}/{fleet_name}"
+                results[key] = measure(calls, seed, max_seconds)
+                print(f"{key:40s} p50 {results[key]['p50_us']:12.1f} us", file=sys.stderr)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+# ----------------------------------------------------------------------------- #
+# Baseline comparison                                                           #
+# ----------------------------------------------------------------------------- #
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return a line per case whose p50 latency grew by more than *tolerance*."""
+    regressions = []
+    for key, result in report["results"].items():
+        old = baseline["results"].get(key)
+        if old is None:
+            continue
+        ratio = result["p50_us"] / old["p50_us"]
+        if ratio > 1 + tolerance:
+            regressions.append(
+                f"{key}: p50 {old['p50_us']:.1f} -> {result['p50_us']:.1f} us ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--fleets", nargs="+", choices=list(FLEETS), default=list(FLEETS))
+    parser.add_argument("--positions", type=int, default=200)
+    parser.add_argument("--games", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--max-seconds", type=float, default=5.0, help="per case")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.sizes, args.fleets, args.positions, args.games, args.seed, args.max_seconds
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
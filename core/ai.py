@@ -1,6 +1,15 @@
 import random
+from typing import TYPE_CHECKING
+
 import numpy as np
-from core.config import grid_size, ship_lengths
+from core.config import GameConfig
+from core.exact import exact_probability_grid
+from core.metrics import timer
+from core.placements import placement_table
+from core.targeting import TargetingState
+
+if TYPE_CHECKING:
+    from core.opening_book import OpeningBook
 
 
 # ----------------------------------------------------------------------------- #
@@ -20,12 +29,13 @@ def _build_probability_grid(
       * it does not overlap a known miss,
       * it includes every still-live hit.
     """
+    n = computer_guesses.shape[0]
     prob = np.zeros_like(computer_guesses, dtype=int)
 
     for length in remaining_lengths:
         # Horizontal placements -------------------------------------------------
-        for r in range(grid_size):
-            for c in range(grid_size - length + 1):
+        for r in range(n):
+            for c in range(n - length + 1):
                 cells = [(r, cc) for cc in range(c, c + length)]
 
                 # Crosses a known miss?
@@ -44,8 +54,8 @@ def _build_probability_grid(
                         prob[x, y] += 1
 
         # Vertical placements ---------------------------------------------------
-        for c in range(grid_size):
-            for r in range(grid_size - length + 1):
+        for c in range(n):
+            for r in range(n - length + 1):
                 cells = [(rr, c) for rr in range(r, r + length)]
                 if any(
                     computer_guesses[x, y] == 1 and (x, y) not in hits
@@ -61,50 +71,289 @@ def _build_probability_grid(
     return prob
 
 
+def _build_probability_grid_np(
+    computer_guesses: np.ndarray,
+    hits: list[tuple[int, int]],
+    remaining_lengths: list[int],
+) -> np.ndarray:
+    """
+    NumPy version of :func:`_build_probability_grid` with identical output.
+
+    Each length is scored in one pass over its cached placement table: the
+    miss and hit masks are gathered per placement and summed along the ship,
+    so legality is two comparisons and the heat-map is a single ``bincount``.
+    """
+    n = computer_guesses.shape[0]
+    guessed = computer_guesses.ravel() == 1
+
+    hit_mask = np.zeros(n * n, dtype=bool)
+    for x, y in hits:
+        hit_mask[x * n + y] = True
+    miss_mask = guessed & ~hit_mask
+    n_hits = int(hit_mask.sum())
+
+    counts = np.zeros(n * n, dtype=int)
+    for length in remaining_lengths:
+        cells = placement_table(n, length)
+        legal = ~miss_mask[cells].any(axis=1)
+        if n_hits:
+            legal &= hit_mask[cells].sum(axis=1) == n_hits
+        counts += np.bincount(cells[legal].ravel(), minlength=n * n)
+
+    counts[guessed] = 0
+    return counts.reshape(n, n)
+
+
+def _pick_best(prob: np.ndarray, rng: random.Random = random) -> tuple[int, int]:
+    """Random choice among the highest-scoring cells."""
+    best_score = prob.max()
+    candidates = np.argwhere(prob == best_score)
+    r, c = rng.choice(candidates)
+    return int(r), int(c)
+
+
+def _config_fleet(config: GameConfig | None, n: int) -> list[int]:
+    """The full fleet of *config*, for callers that do not track sunk ships."""
+    if config is None:
+        raise ValueError("Pass remaining_lengths or the game's config.")
+    if config.grid_size != n:
+        raise ValueError(f"config is for {config.grid_size}x{config.grid_size} boards, not {n}x{n}")
+    return list(config.ship_lengths)
+
+
+_ENGINES = {
+    "python": _build_probability_grid,
+    "numpy": _build_probability_grid_np,
+}
+
+
 # ----------------------------------------------------------------------------- #
 # Public API – called from UI                                                   #
 # ----------------------------------------------------------------------------- #
 def get_computer_target(
     computer_hits: list[tuple[int, int]],
     computer_guesses: np.ndarray,
-    grid_size: int = grid_size,
+    grid_size: int | None = None,
     remaining_lengths: list[int] | None = None,
+    engine: str = "numpy",
+    state: TargetingState | None = None,
+    mode: str = "heuristic",
+    time_budget: float = 0.1,
+    book: "OpeningBook | None" = None,
+    rng: random.Random = random,
+    config: GameConfig | None = None,
 ) -> tuple[int, int]:
     """
     Choose the computer’s next guess.
 
+    The board size is taken from *computer_guesses* (*grid_size*, if given,
+    must match). Without *remaining_lengths* the whole fleet of the game's
+    *config* is assumed; one of the two is required.
+
     * **Hunt mode** – build a probability grid from *remaining_lengths*.
     * **Target mode** – if there are live hits, boost their four neighbours.
 
-    Ties are broken randomly so the bot’s play remains varied.
+    *engine* selects the heat-map builder: ``"numpy"`` (default), the
+    reference ``"python"`` loops, or ``"incremental"``, which reads the
+    per-game *state* instead of rebuilding (a fresh state is built from the
+    board if none is given). All three produce the same grid.
+
+    ``mode="exact"`` scores cells by joint, non-overlapping fleet
+    configurations instead (see :mod:`core.exact`), bounded by
+    *time_budget* seconds, and needs no neighbour nudge. It falls back to
+    the heuristic if no consistent configuration was found.
+
+    With an opening *book*, hunt-mode heuristic moves (no live hits) are
+    looked up instead of scored; the candidates and the random pick are the
+    same as without it.
+
+    Ties are broken randomly so the bot’s play remains varied. Every draw
+    comes from *rng* (default: the global :mod:`random` state), so passing a
+    seeded ``random.Random`` makes the choice reproducible.
     """
+    n = computer_guesses.shape[0]
+    if grid_size is not None and grid_size != n:
+        raise ValueError(f"grid_size {grid_size} does not match a {n}x{n} board")
     if remaining_lengths is None:
-        remaining_lengths = ship_lengths
+        remaining_lengths = _config_fleet(config, n)
+    if state is not None and engine != "incremental":
+        raise ValueError(f"A targeting state needs engine='incremental', not {engine!r}")
+    if engine == "incremental":
+        if state is None:
+            state = TargetingState.from_board(computer_guesses, computer_hits)
+        build_grid = None
+    else:
+        try:
+            build_grid = _ENGINES[engine]
+        except KeyError:
+            raise ValueError(f"Unknown targeting engine: {engine!r}") from None
+    if mode not in ("heuristic", "exact"):
+        raise ValueError(f"Unknown targeting mode: {mode!r}")
 
-    # 1) Build base heat-map ----------------------------------------------------
-    prob = _build_probability_grid(computer_guesses, computer_hits, remaining_lengths)
+    # 0) Exact posterior -------------------------------------------------------
+    if mode == "exact":
+        with timer("ai.exact"):
+            prob = exact_probability_grid(
+                computer_guesses,
+                computer_hits,
+                remaining_lengths,
+                time_budget,
+                rng=np.random.default_rng(rng.getrandbits(64)),
+            )
+        if prob.max() > 0:
+            return _pick_best(prob, rng)
 
-    # 2) Target mode boost ------------------------------------------------------
+    # 1) Hunt-phase lookup ------------------------------------------------------
+    if book is not None and not computer_hits:
+        with timer("ai.opening_book"):
+            best = book.best_cells(computer_guesses, remaining_lengths)
+        if best is not None:
+            cell = rng.choice(best)
+            return divmod(int(cell), n)
+
+    # 2) Build base heat-map ----------------------------------------------------
+    with timer("ai.heat_map"):
+        if state is not None:
+            prob = state.probability_grid(remaining_lengths)
+        else:
+            prob = build_grid(computer_guesses, computer_hits, remaining_lengths)
+
+    # 3) Target mode boost ------------------------------------------------------
     if computer_hits:
         for hr, hc in computer_hits:
             for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
                 nr, nc = hr + dr, hc + dc
                 if (
-                    0 <= nr < grid_size
-                    and 0 <= nc < grid_size
+                    0 <= nr < n
+                    and 0 <= nc < n
                     and computer_guesses[nr, nc] == 0
                 ):
                     prob[nr, nc] += 5  # strong nudge to finish that ship
 
-    # 3) First move fallback – checkerboard -------------------------------------
+    # 4) First move fallback – checkerboard -------------------------------------
     if prob.max() == 0:
         prob = np.fromfunction(
-            lambda r, c: ((r + c) % 2 == 0).astype(int), (grid_size, grid_size)
+            lambda r, c: ((r + c) % 2 == 0).astype(int), (n, n)
         )
         prob[computer_guesses == 1] = 0
+        if prob.max() == 0:  # only odd-parity cells left
+            prob = (computer_guesses == 0).astype(int)
 
-    # 4) Random choice among best candidates ------------------------------------
-    best_score = prob.max()
-    candidates = np.argwhere(prob == best_score)
-    r, c = random.choice(candidates)
-    return int(r), int(c)
+    # 5) Random choice among best candidates ------------------------------------
+    return _pick_best(prob, rng)
+
+
+# ----------------------------------------------------------------------------- #
+# Batch API – self-play, dataset generation, strategy evaluation                #
+# ----------------------------------------------------------------------------- #
+def _window_sums(x: np.ndarray, length: int) -> np.ndarray:
+    """Sums of *length* consecutive cells along the last axis (valid windows only)."""
+    c = np.cumsum(x, axis=-1)
+    c = np.concatenate([np.zeros(x.shape[:-1] + (1,), dtype=c.dtype), c], axis=-1)
+    return c[..., length:] - c[..., :-length]
+
+
+def _coverage(starts: np.ndarray, length: int) -> np.ndarray:
+    """Per cell, the weight of window starts whose *length*-cell window covers it."""
+    pad = np.zeros(starts.shape[:-1] + (length - 1,), dtype=starts.dtype)
+    return _window_sums(np.concatenate([pad, starts, pad], axis=-1), length)
+
+
+def batch_probability_grids(
+    computer_guesses: np.ndarray,
+    hits: np.ndarray,
+    remaining_lengths: list[list[int]],
+) -> np.ndarray:
+    """
+    :func:`_build_probability_grid` for a stack of ``(B, N, N)`` boards.
+
+    *hits* is a ``(B, N, N)`` mask of live hits and *remaining_lengths* one
+    fleet per board. Each ship length is scored for the whole batch at once:
+    sliding-window sums over rows and columns give the misses and hits under
+    every placement, and a second window sum spreads the legal placements
+    back onto their cells.
+    """
+    guessed = computer_guesses == 1
+    hits = hits.astype(bool)
+    misses = (guessed & ~hits).astype(np.int32)
+    hit_counts = hits.astype(np.int32)
+    n_hits = hit_counts.sum(axis=(1, 2))[:, None, None]
+    n = guessed.shape[-1]
+
+    lengths = sorted({length for fleet in remaining_lengths for length in fleet})
+    multiplicity = np.zeros((len(remaining_lengths), len(lengths)), dtype=np.int64)
+    for b, fleet in enumerate(remaining_lengths):
+        for length in fleet:
+            multiplicity[b, lengths.index(length)] += 1
+
+    counts = np.zeros(guessed.shape, dtype=np.int64)
+    for j, length in enumerate(lengths):
+        if length > n:
+            continue
+        weight = multiplicity[:, j][:, None, None]
+        for axis_swap in (False, True):  # horizontal, then vertical placements
+            m = misses.swapaxes(1, 2) if axis_swap else misses
+            h = hit_counts.swapaxes(1, 2) if axis_swap else hit_counts
+            legal = (_window_sums(m, length) == 0) & (_window_sums(h, length) == n_hits)
+            covered = _coverage(legal * weight, length)
+            counts += covered.swapaxes(1, 2) if axis_swap else covered
+
+    counts[guessed] = 0
+    return counts
+
+
+def get_computer_targets(
+    computer_guesses: np.ndarray,
+    hits: np.ndarray,
+    remaining_lengths: list[list[int]] | None = None,
+    rng: np.random.Generator | list[np.random.Generator] | None = None,
+    config: GameConfig | None = None,
+) -> np.ndarray:
+    """
+    Heuristic :func:`get_computer_target` for a batch of boards.
+
+    Takes ``(B, N, N)`` guesses and live-hit masks and returns a ``(B, 2)``
+    array of ``(row, col)`` targets: the same heat-map, neighbour nudge and
+    checkerboard fallback, with ties broken uniformly.
+
+    *rng* is a single generator for the whole batch, or one generator per
+    board so each board's choice depends only on its own stream (and stays
+    reproducible however the boards are batched). Without
+    *remaining_lengths* every board is scored for the whole fleet of
+    *config*.
+    """
+    batch, n = computer_guesses.shape[0], computer_guesses.shape[-1]
+    if remaining_lengths is None:
+        remaining_lengths = [_config_fleet(config, n)] * batch
+    hits = hits.astype(bool)
+    unguessed = computer_guesses == 0
+
+    # Heat-map plus +5 per live-hit neighbour ------------------------------------
+    prob = batch_probability_grids(computer_guesses, hits, remaining_lengths)
+    nudge = np.zeros(prob.shape, dtype=np.int64)
+    nudge[:, 1:, :] += hits[:, :-1, :]
+    nudge[:, :-1, :] += hits[:, 1:, :]
+    nudge[:, :, 1:] += hits[:, :, :-1]
+    nudge[:, :, :-1] += hits[:, :, 1:]
+    prob += 5 * nudge * unguessed
+
+    # Checkerboard where nothing scored ----------------------------------------
+    empty = prob.reshape(batch, -1).max(axis=1) == 0
+    if empty.any():
+        checker = (np.add.outer(np.arange(n), np.arange(n)) % 2 == 0)
+        prob[empty] = checker & unguessed[empty]
+        odd_only = empty & (prob.reshape(batch, -1).max(axis=1) == 0)
+        prob[odd_only] = unguessed[odd_only]
+
+    # Uniform pick among each board's best cells ------------------------------
+    flat = prob.reshape(batch, -1)
+    best = flat == flat.max(axis=1, keepdims=True)
+    if rng is None:
+        rng = np.random.default_rng()
+    if isinstance(rng, np.random.Generator):
+        u = rng.random(batch)
+    else:
+        u = np.array([g.random() for g in rng])
+    k = (u * best.sum(axis=1)).astype(np.int64)
+    cell = np.argmax(np.cumsum(best, axis=1) > k[:, None], axis=1)
+    return np.stack(divmod(cell, n), axis=1)
@@ -0,0 +1,134 @@
+import numpy as np
+
+
+# ----------------------------------------------------------------------------- #
+# Mask <-> array conversion                                                     #
+# ----------------------------------------------------------------------------- #
+def mask_from_array(board: np.ndarray) -> int:
+    """Pack the non-zero cells of a 2-D board into an integer bitmask."""
+    packed = np.packbits(board.ravel() != 0, bitorder="little")
+    return int.from_bytes(packed.tobytes(), "little")
+
+
+def mask_to_array(mask: int, grid_size: int) -> np.ndarray:
+    """Unpack a bitmask into a ``(grid_size, grid_size)`` int board of 0/1."""
+    n_cells = grid_size * grid_size
+    raw = np.frombuffer(mask.to_bytes((n_cells + 7) // 8, "little"), dtype=np.uint8)
+    bits = np.unpackbits(raw, bitorder="little")[:n_cells]
+    return bits.astype(int).reshape(grid_size, grid_size)
+
+
+def mask_from_cells(cells: list[tuple[int, int]], grid_size: int) -> int:
+    mask = 0
+    for r, c in cells:
+        mask |= 1 << (int(r) * grid_size + int(c))
+    return mask
+
+
+def mask_to_cells(mask: int, grid_size: int) -> list[tuple[int, int]]:
+    cells = []
+    while mask:
+        low = mask & -mask
+        cells.append(divmod(low.bit_length() - 1, grid_size))
+        mask ^= low
+    return cells
+
+
+# ----------------------------------------------------------------------------- #
+# One side of the game                                                          #
+# ----------------------------------------------------------------------------- #
+class BoardState:
+    """
+    A fleet and the shots fired at it, stored as integer bitmasks.
+
+    Bit ``r * grid_size + c`` stands for cell ``(r, c)``. Hit, sunk and win
+    tests are single mask operations instead of scans over cell lists.
+    """
+
+    __slots__ = ("grid_size", "ship_masks", "fleet_mask", "shots")
+
+    def __init__(self, grid_size: int):
+        self.grid_size = grid_size
+        self.ship_masks: list[int] = []
+        self.fleet_mask = 0
+        self.shots = 0
+
+    @classmethod
+    def from_ships(
+        cls,
+        ships: list[list[tuple[int, int]]],
+        grid_size: int,
+        guesses: np.ndarray | None = None,
+    ) -> "BoardState":
+        """Build a state from ship cell lists and an optional guess board."""
+        state = cls(grid_size)
+        for ship in ships:
+            state.add_ship(ship)
+        if guesses is not None:
+            state.shots = mask_from_array(guesses)
+        return state
+
+    def add_ship(self, cells: list[tuple[int, int]]) -> int:
+        """Add a ship and return its index."""
+        mask = mask_from_cells(cells, self.grid_size)
+        self.ship_masks.append(mask)
+        self.fleet_mask |= mask
+        return len(self.ship_masks) - 1
+
+    # ------------------------------------------------------------------------- #
+    # Shots                                                                     #
+    # ------------------------------------------------------------------------- #
+    def fire(self, r: int, c: int) -> int | None:
+        """Record a shot at ``(r, c)``; return the index of the ship hit, if any."""
+        bit = 1 << (int(r) * self.grid_size + int(c))
+        self.shots |= bit
+        if not self.fleet_mask & bit:
+            return None
+        for i, mask in enumerate(self.ship_masks):
+            if mask & bit:
+                return i
+        return None
+
+    def is_sunk(self, index: int) -> bool:
+        mask = self.ship_masks[index]
+        return self.shots & mask == mask
+
+    def all_sunk(self) -> bool:
+        return self.fleet_mask & ~self.shots == 0
+
+    def sunk_mask(self) -> int:
+        mask = 0
+        for ship in self.ship_masks:
+            if self.shots & ship == ship:
+                mask |= ship
+        return mask
+
+    def remaining_lengths(self) -> list[int]:
+        """Lengths of the ships that are not sunk yet (never empty)."""
+        lengths = [
+            ship.bit_count()
+            for ship in self.ship_masks
+            if self.shots & ship != ship
+        ]
+        return lengths or [1]
+
+    def live_hits(self) -> list[tuple[int, int]]:
+        """Hit cells that belong to ships still afloat."""
+        return mask_to_cells(
+            self.shots & self.fleet_mask & ~self.sunk_mask(), self.grid_size
+        )
+
+    # ------------------------------------------------------------------------- #
+    # Conversion                                                                #
+    # ------------------------------------------------------------------------- #
+    def ships(self) -> list[list[tuple[int, int]]]:
+        return [mask_to_cells(mask, self.grid_size) for mask in self.ship_masks]
+
+    def ship_cells(self, index: int) -> list[tuple[int, int]]:
+        return mask_to_cells(self.ship_masks[index], self.grid_size)
+
+    def shots_array(self) -> np.ndarray:
+        return mask_to_array(self.shots, self.grid_size)
+
+    def fleet_array(self) -> np.ndarray:
+        return mask_to_array(self.fleet_mask, self.grid_size)
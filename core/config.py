@@ -1,2 +1,46 @@
+from dataclasses import dataclass
+
+import numpy as np
+from core.placements import placement_table
+
 grid_size = 5
-ship_lengths = [3, 2]
\ No newline at end of file
+ship_lengths = [3, 2]
+
+
+@dataclass(frozen=True)
+class GameConfig:
+    """Board size and fleet of one game, carried in session state."""
+
+    grid_size: int = grid_size
+    ship_lengths: tuple[int, ...] = tuple(ship_lengths)
+
+    def __post_init__(self):
+        object.__setattr__(self, "ship_lengths", tuple(self.ship_lengths))
+        if not self.ship_lengths:
+            raise ValueError("A fleet needs at least one ship.")
+        if max(self.ship_lengths) > self.grid_size:
+            raise ValueError(
+                f"Ship of length {max(self.ship_lengths)} does not fit on a "
+                f"{self.grid_size}x{self.grid_size} board."
+            )
+        if sum(self.ship_lengths) > self.grid_size * self.grid_size:
+            raise ValueError("Fleet has more cells than the board.")
+
+    def placement_tables(self) -> dict[int, np.ndarray]:
+        """
+        Placement table per ship length, from the process-wide cache in
+        :mod:`core.placements` that every game and config shares.
+        """
+        return {
+            length: placement_table(self.grid_size, length)
+            for length in set(self.ship_lengths)
+        }
+
+
+DEFAULT_CONFIG = GameConfig()
+
+PRESETS = {
+    "Classic 5×5": DEFAULT_CONFIG,
+    "10×10 standard fleet": GameConfig(10, (5, 4, 3, 3, 2)),
+    "20×20 standard fleet": GameConfig(20, (5, 4, 3, 3, 2)),
+}
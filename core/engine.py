@@ -0,0 +1,315 @@
+"""
+Streamlit-free game engine and an in-process session manager.
+
+A :class:`Game` holds both fleets as :class:`~core.bitboard.BoardState`
+bitmasks plus the computer's targeting state. :func:`place`, :func:`fire`
+and :func:`computer_turn` are the only operations that change it, so the
+same engine can back the Streamlit app, a server or the simulator.
+
+Games are reproducible from their ``seed``: it places the computer's fleet,
+and each computer move draws from a ``random.Random`` seeded with the seed
+and the move number, so no RNG state needs storing or sharing between
+threads.
+"""
+import random
+import secrets
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+from core.ai import get_computer_target
+from core.bitboard import BoardState, mask_to_cells
+from core.config import DEFAULT_CONFIG, GameConfig
+from core.game_logic import is_valid_ship_selection, prune_sunk_hits, sample_fleet
+from core.targeting import TargetingState
+
+PHASES = ("placing", "playing", "won", "lost")
+
+
+class Shot(NamedTuple):
+    """Outcome of one shot: the ship index hit (or ``None``) and whether it sank."""
+
+    r: int
+    c: int
+    ship: int | None
+    sunk: bool
+
+
+class Game:
+    """
+    State of one game.
+
+    ``player`` is the player's fleet and the computer's shots at it,
+    ``opponent`` the computer's fleet and the player's shots.
+    ``computer_guesses``, ``computer_hits`` and ``targeting`` are derived
+    from ``player`` and kept in sync for the AI.
+    """
+
+    __slots__ = (
+        "config",
+        "player",
+        "opponent",
+        "phase",
+        "seed",
+        "computer_guesses",
+        "computer_hits",
+        "targeting",
+    )
+
+    def __init__(
+        self,
+        config: GameConfig,
+        player: BoardState,
+        opponent: BoardState,
+        phase: str,
+        seed: int = 0,
+    ):
+        self.config = config
+        self.player = player
+        self.opponent = opponent
+        self.phase = phase
+        self.seed = seed
+        self.computer_guesses = player.shots_array()
+        self.computer_hits = player.live_hits()
+        self.targeting = TargetingState.from_board(self.computer_guesses, self.computer_hits)
+
+    # ------------------------------------------------------------------------- #
+    # Compact serialisation                                                     #
+    # ------------------------------------------------------------------------- #
+    # Header: version, grid size, phase, player ship count, opponent ship
+    # count, seed.
+    _HEADER = struct.Struct("<BHBBBQ")
+    # Ship: start cell, length, vertical flag.
+    _SHIP = struct.Struct("<HBB")
+    _VERSION = 1
+
+    def to_bytes(self) -> bytes:
+        """Pack the game into a few bytes per ship plus two shot bitmasks."""
+        n = self.config.grid_size
+        mask_bytes = (n * n + 7) // 8
+        parts = [
+            self._HEADER.pack(
+                self._VERSION,
+                n,
+                PHASES.index(self.phase),
+                len(self.player.ship_masks),
+                len(self.opponent.ship_masks),
+                self.seed,
+            ),
+            bytes(self.config.ship_lengths),
+        ]
+        for side in (self.player, self.opponent):
+            for mask in side.ship_masks:
+                cells = mask_to_cells(mask, n)
+                vertical = len(cells) > 1 and cells[0][1] == cells[1][1]
+                start = cells[0][0] * n + cells[0][1]
+                parts.append(self._SHIP.pack(start, len(cells), vertical))
+            parts.append(side.shots.to_bytes(mask_bytes, "little"))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Game":
+        version, n, phase, n_player, n_opponent, seed = cls._HEADER.unpack_from(data)
+        if version != cls._VERSION:
+            raise ValueError(f"Unsupported game encoding version {version}")
+        offset = cls._HEADER.size
+        mask_bytes = (n * n + 7) // 8
+
+        # The fleet is not length-prefixed: it fills the gap before the ships
+        # and shot masks, whose sizes are known from the header.
+        fleet_size = (
+            len(data) - offset - (n_player + n_opponent) * cls._SHIP.size - 2 * mask_bytes
+        )
+        config = GameConfig(n, tuple(data[offset:offset + fleet_size]))
+        offset += fleet_size
+
+        sides = []
+        for count in (n_player, n_opponent):
+            side = BoardState(n)
+            for _ in range(count):
+                start, length, vertical = cls._SHIP.unpack_from(data, offset)
+                offset += cls._SHIP.size
+                r, c = divmod(start, n)
+                side.add_ship(
+                    [(r + i, c) if vertical else (r, c + i) for i in range(length)]
+                )
+            side.shots = int.from_bytes(data[offset:offset + mask_bytes], "little")
+            offset += mask_bytes
+            sides.append(side)
+        return cls(config, sides[0], sides[1], PHASES[phase], seed)
+
+
+# ----------------------------------------------------------------------------- #
+# Operations                                                                    #
+# ----------------------------------------------------------------------------- #
+def new_game(config: GameConfig = DEFAULT_CONFIG, seed: int | None = None) -> Game:
+    """
+    Start a game with a random computer fleet and no player ships yet.
+    Without a *seed* one is drawn from the global :mod:`random` state.
+    """
+    if seed is None:
+        seed = random.getrandbits(63)
+    n = config.grid_size
+    opponent = BoardState(n)
+    for cells in sample_fleet(config, np.random.default_rng(seed)):
+        opponent.add_ship([divmod(int(i), n) for i in cells])
+    return Game(config, BoardState(n), opponent, "placing", seed)
+
+
+def place(game: Game, cells: list[tuple[int, int]]) -> None:
+    """
+    Add the player's next ship. Raises ``ValueError`` if the cells are not a
+    straight, adjacent line of the required length or overlap another ship.
+    """
+    if game.phase != "placing":
+        raise ValueError("All ships are already placed.")
+    n = game.config.grid_size
+    required = game.config.ship_lengths[len(game.player.ship_masks)]
+    if len(cells) != required:
+        raise ValueError(f"This ship needs {required} cells.")
+    if not all(0 <= r < n and 0 <= c < n for r, c in cells):
+        raise ValueError("Cells must be on the board.")
+    if not is_valid_ship_selection(cells):
+        raise ValueError("Cells must be in a straight line and adjacent.")
+    if any(game.player.fleet_mask >> (r * n + c) & 1 for r, c in cells):
+        raise ValueError("Ships cannot overlap.")
+
+    game.player.add_ship(cells)
+    if len(game.player.ship_masks) == len(game.config.ship_lengths):
+        game.phase = "playing"
+
+
+def _check_shot(game: Game, side: BoardState, r: int, c: int) -> None:
+    """Raise ``ValueError`` unless *side* can be fired at on ``(r, c)`` now."""
+    n = game.config.grid_size
+    if game.phase != "playing":
+        raise ValueError(f"Cannot fire while the game is {game.phase}.")
+    if not (0 <= r < n and 0 <= c < n):
+        raise ValueError(f"({r}, {c}) is not on the board.")
+    if side.shots >> (r * n + c) & 1:
+        raise ValueError(f"({r}, {c}) was already fired at.")
+
+
+def fire(game: Game, r: int, c: int) -> Shot:
+    """The player fires at the computer's fleet."""
+    _check_shot(game, game.opponent, r, c)
+    ship = game.opponent.fire(r, c)
+    sunk = ship is not None and game.opponent.is_sunk(ship)
+    if game.opponent.all_sunk():
+        game.phase = "won"
+    return Shot(r, c, ship, sunk)
+
+
+def move_rng(game: Game) -> random.Random:
+    """RNG for the computer's next move, fixed by the seed and the move number."""
+    return random.Random(game.seed << 16 | game.player.shots.bit_count())
+
+
+def computer_target(game: Game, engine: str = "incremental", **kwargs) -> tuple[int, int]:
+    """
+    The computer's next target; *kwargs* go to ``get_computer_target``.
+    The default ``"incremental"`` engine reads the game's targeting state.
+    """
+    kwargs.setdefault("rng", move_rng(game))
+    if engine == "incremental":
+        kwargs["state"] = game.targeting
+    return get_computer_target(
+        game.computer_hits,
+        game.computer_guesses,
+        game.config.grid_size,
+        remaining_lengths=game.player.remaining_lengths(),
+        engine=engine,
+        **kwargs,
+    )
+
+
+def computer_turn(game: Game, target: tuple[int, int] | None = None, **kwargs) -> Shot:
+    """
+    The computer fires at *target*, or at :func:`computer_target` if none is
+    given (e.g. when a precomputed move is not available).
+    """
+    if game.phase != "playing":
+        raise ValueError(f"Cannot fire while the game is {game.phase}.")
+    r, c = target if target is not None else computer_target(game, **kwargs)
+    _check_shot(game, game.player, r, c)
+
+    game.computer_guesses[r, c] = 1
+    ship = game.player.fire(r, c)
+    game.targeting.record_shot(r, c, ship is not None)
+    sunk = False
+    if ship is not None:
+        game.computer_hits.append((r, c))
+        if game.player.is_sunk(ship):
+            sunk = True
+            prune_sunk_hits(game.computer_hits, game.player, ship, game.targeting)
+    if game.player.all_sunk():
+        game.phase = "lost"
+    return Shot(r, c, ship, sunk)
+
+
+# ----------------------------------------------------------------------------- #
+# Session manager                                                               #
+# ----------------------------------------------------------------------------- #
+class SessionManager:
+    """
+    Many concurrent games in one process with bounded memory.
+
+    At most *max_active* games stay live; the least recently used ones, and
+    any idle for *idle_seconds*, are frozen to :meth:`Game.to_bytes` and
+    thawed transparently by :meth:`get`.
+    """
+
+    def __init__(self, max_active: int = 1000, idle_seconds: float = 300.0, clock=time.monotonic):
+        self.max_active = max_active
+        self.idle_seconds = idle_seconds
+        self._clock = clock
+        self._active: OrderedDict[str, tuple[Game, float]] = OrderedDict()
+        self._frozen: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def create(self, config: GameConfig = DEFAULT_CONFIG, seed: int | None = None) -> str:
+        game_id = secrets.token_hex(8)
+        with self._lock:
+            self._active[game_id] = (new_game(config, seed), self._clock())
+            self._evict()
+        return game_id
+
+    def get(self, game_id: str) -> Game:
+        """Return a live game, restoring it if it was frozen. ``KeyError`` if unknown."""
+        with self._lock:
+            if game_id in self._active:
+                game, _ = self._active.pop(game_id)
+            else:
+                game = Game.from_bytes(self._frozen.pop(game_id))
+            self._active[game_id] = (game, self._clock())
+            self._evict()
+            return game
+
+    def drop(self, game_id: str) -> None:
+        with self._lock:
+            self._active.pop(game_id, None)
+            self._frozen.pop(game_id, None)
+
+    def evict_idle(self) -> None:
+        with self._lock:
+            self._evict()
+
+    def _evict(self) -> None:
+        now = self._clock()
+        while self._active:
+            game_id, (game, seen) = next(iter(self._active.items()))
+            if len(self._active) <= self.max_active and now - seen < self.idle_seconds:
+                break
+            del self._active[game_id]
+            self._frozen[game_id] = game.to_bytes()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active": len(self._active),
+                "frozen": len(self._frozen),
+                "frozen_bytes": sum(len(b) for b in self._frozen.values()),
+            }
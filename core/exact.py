@@ -0,0 +1,152 @@
+import time
+
+import numpy as np
+from core.placements import placement_table
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+# ----------------------------------------------------------------------------- #
+# Exact enumeration                                                             #
+# ----------------------------------------------------------------------------- #
+def _enumerate(
+    n: int,
+    miss_mask: np.ndarray,
+    hit_bits: int,
+    lengths: list[int],
+    deadline: float,
+    max_states: int,
+) -> np.ndarray:
+    """
+    Count, for every cell, the joint fleet configurations that occupy it.
+
+    A configuration places every ship in *lengths* without overlaps and off
+    known misses, and together the ships cover every live hit. Sub-boards are
+    memoised on ``(ship index, occupied bitmask)``.
+    """
+    placements = {}
+    for length in set(lengths):
+        cells = placement_table(n, length)
+        cells = cells[~miss_mask[cells].any(axis=1)]
+        masks = [sum(1 << int(i) for i in row) for row in cells]
+        placements[length] = list(zip(masks, cells))
+
+    capacity = np.cumsum([0] + lengths[::-1])[::-1]  # ship cells left from depth i
+    memo: dict[tuple[int, int], tuple[int, np.ndarray | None]] = {}
+
+    def count(depth: int, occupied: int) -> tuple[int, np.ndarray | None]:
+        uncovered = (hit_bits & ~occupied).bit_count()
+        if uncovered > capacity[depth]:
+            return 0, None
+        if depth == len(lengths):
+            return 1, np.zeros(n * n)
+
+        key = (depth, occupied)
+        if key in memo:
+            return memo[key]
+        if len(memo) >= max_states or time.perf_counter() > deadline:
+            raise _BudgetExceeded
+
+        total, grid = 0, np.zeros(n * n)
+        for mask, cells in placements[lengths[depth]]:
+            if mask & occupied:
+                continue
+            sub_total, sub_grid = count(depth + 1, occupied | mask)
+            if sub_total:
+                total += sub_total
+                grid += sub_grid
+                grid[cells] += sub_total
+        memo[key] = (total, grid if total else None)
+        return memo[key]
+
+    total, grid = count(0, 0)
+    return grid if total else np.zeros(n * n)
+
+
+# ----------------------------------------------------------------------------- #
+# Monte Carlo fallback                                                          #
+# ----------------------------------------------------------------------------- #
+def _sample(
+    n: int,
+    miss_mask: np.ndarray,
+    hit_mask: np.ndarray,
+    lengths: list[int],
+    deadline: float,
+    rng,
+    work: int = 1 << 20,
+) -> np.ndarray:
+    """
+    Estimate the same per-cell counts by sequential importance sampling.
+
+    Ships are placed one after another on a batch of boards at once, each
+    drawn uniformly from its free placements; the product of the choice
+    counts is the sample weight, so accepted fleets give an unbiased
+    estimate. The batch is sized so one ship step gathers about *work*
+    cells, and the deadline is checked before every step, so large boards
+    overrun the budget by at most one step.
+    """
+    grid = np.zeros(n * n)
+    tables = [placement_table(n, length) for length in lengths]
+    batch = int(np.clip(work // max(t.size for t in tables), 8, 512))
+    rows = np.arange(batch)
+
+    while time.perf_counter() < deadline:
+        occupied = np.repeat(miss_mask[None, :], batch, axis=0)
+        fleet = np.zeros((batch, n * n), dtype=bool)
+        weight = np.ones(batch)
+        for cells in tables:
+            if time.perf_counter() > deadline:
+                return grid  # drop the unfinished batch
+            free = ~occupied[:, cells].any(axis=2)
+            n_free = free.sum(axis=1)
+            keys = rng.random(free.shape)
+            keys[~free] = -1.0
+            chosen = cells[keys.argmax(axis=1)]
+            weight *= n_free
+            occupied[rows[:, None], chosen] = True
+            fleet[rows[:, None], chosen] = True
+        accepted = (weight > 0) & (fleet[:, hit_mask].all(axis=1))
+        grid += (fleet[accepted] * weight[accepted, None]).sum(axis=0)
+    return grid
+
+
+# ----------------------------------------------------------------------------- #
+# Public entry point                                                            #
+# ----------------------------------------------------------------------------- #
+def exact_probability_grid(
+    computer_guesses: np.ndarray,
+    hits: list[tuple[int, int]],
+    remaining_lengths: list[int],
+    time_budget: float = 0.1,
+    max_states: int = 200_000,
+    rng=np.random,
+) -> np.ndarray:
+    """
+    Posterior heat-map over joint, non-overlapping fleet configurations.
+
+    The exact count is attempted first within half of *time_budget* (seconds)
+    and *max_states* memo entries; if it does not finish, the rest of the
+    budget is spent on Monte Carlo sampling. Guessed cells score 0. The
+    scale is arbitrary – only the ordering of cells matters.
+    """
+    start = time.perf_counter()
+    n = computer_guesses.shape[0]
+    guessed = computer_guesses.ravel() == 1
+    hit_mask = np.zeros(n * n, dtype=bool)
+    for r, c in hits:
+        hit_mask[r * n + c] = True
+    miss_mask = guessed & ~hit_mask
+    lengths = sorted(remaining_lengths, reverse=True)
+
+    try:
+        hit_bits = sum(1 << int(i) for i in np.flatnonzero(hit_mask))
+        grid = _enumerate(
+            n, miss_mask, hit_bits, lengths, start + time_budget / 2, max_states
+        )
+    except _BudgetExceeded:
+        grid = _sample(n, miss_mask, hit_mask, lengths, start + time_budget, rng)
+
+    grid[guessed] = 0
+    return grid.reshape(n, n)
@@ -1,4 +1,7 @@
-from core.config import grid_size, ship_lengths
+from core.bitboard import BoardState
+from core.config import GameConfig
+from core.placements import placement_table
+from core.targeting import TargetingState
 import numpy as np
 
 def is_valid_ship_selection(cells):
@@ -16,24 +19,110 @@ def is_valid_ship_selection(cells):
         return sorted(rows) == list(range(min(rows), max(rows) + 1))
     return False
 
-def place_opponent_ships():
-        board = np.zeros((grid_size, grid_size), dtype=int)
-        ships = []
-        for length in ship_lengths:
-            placed = False
-            while not placed:
-                r, c = np.random.randint(0, grid_size, size=2)
-                horizontal = np.random.rand() > 0.5
-                if horizontal and c + length <= grid_size and np.all(board[r, c:c+length] == 0):
-                    board[r, c:c+length] = 1
-                    ships.append([(r, i) for i in range(c, c+length)])
-                    placed = True
-                elif not horizontal and r + length <= grid_size and np.all(board[r:r+length, c] == 0):
-                    board[r:r+length, c] = 1
-                    ships.append([(i, c) for i in range(r, r+length)])
-                    placed = True
-        return board, ships
+class ImpossibleFleetError(ValueError):
+    """Raised when a fleet cannot be placed on the board without overlaps."""
+
+
+def _fleet_order(ship_lengths):
+    # Longest ships first: they have the fewest placements and fail earliest.
+    return sorted(range(len(ship_lengths)), key=lambda i: -ship_lengths[i])
+
+
+def sample_fleet(config: GameConfig, rng=np.random):
+    """
+    Draw a random non-overlapping fleet for *config* and return one
+    ``(length,)`` array of flat cell indices per ship, in fleet order.
+
+    Each ship is drawn uniformly from the placements that are still free, and
+    dead ends backtrack instead of retrying blindly. Raises
+    :class:`ImpossibleFleetError` if no arrangement exists.
+    """
+    grid_size, ship_lengths = config.grid_size, config.ship_lengths
+    order = _fleet_order(ship_lengths)
+    occupied = np.zeros(grid_size * grid_size, dtype=bool)
+    chosen = [None] * len(ship_lengths)
+    dead_ends = set()
+
+    def place(depth):
+        if depth == len(order):
+            return True
+        key = (depth, occupied.tobytes())
+        if key in dead_ends:
+            return False
+        ship = order[depth]
+        cells = placement_table(grid_size, ship_lengths[ship])
+        free = np.flatnonzero(~occupied[cells].any(axis=1))
+        for p in rng.permutation(free):
+            occupied[cells[p]] = True
+            if place(depth + 1):
+                chosen[ship] = cells[p]
+                return True
+            occupied[cells[p]] = False
+        dead_ends.add(key)
+        return False
+
+    if not place(0):
+        raise ImpossibleFleetError(
+            f"Fleet {list(ship_lengths)} does not fit on a {grid_size}x{grid_size} board."
+        )
+    return chosen
+
+
+def place_opponent_ships(config: GameConfig, rng=np.random):
+    grid_size = config.grid_size
+    board = np.zeros((grid_size, grid_size), dtype=int)
+    ships = []
+    for cells in sample_fleet(config, rng):
+        board.flat[cells] = 1
+        ships.append([divmod(int(i), grid_size) for i in cells])
+    return board, ships
+
+
+def place_fleets_bulk(k, config: GameConfig, rng=np.random):
+    """
+    Draw *k* random fleets for *config* at once.
+
+    Returns an int8 array of shape ``(k, grid_size, grid_size)`` where cell
+    value ``i + 1`` marks ship ``i`` and 0 is water. Every ship is placed on
+    all boards in one vectorised step; the rare boards that hit a dead end
+    are redrawn with :func:`sample_fleet`.
+    """
+    grid_size, ship_lengths = config.grid_size, config.ship_lengths
+    n_cells = grid_size * grid_size
+    boards = np.zeros((k, n_cells), dtype=np.int8)
+    rows = np.arange(k)
+    stuck = np.zeros(k, dtype=bool)
+
+    for ship in _fleet_order(ship_lengths):
+        cells = placement_table(grid_size, ship_lengths[ship])
+        free = ~(boards[:, cells] != 0).any(axis=2)
+        keys = rng.random((k, len(cells)))
+        keys[~free] = -1.0
+        choice = keys.argmax(axis=1)
+        stuck |= ~free.any(axis=1)
+        placed = rows[~stuck]
+        boards[placed[:, None], cells[choice[placed]]] = ship + 1
+
+    for i in np.flatnonzero(stuck):
+        boards[i] = 0
+        for ship, cells in enumerate(sample_fleet(config, rng)):
+            boards[i, cells] = ship + 1
+    return boards.reshape(k, grid_size, grid_size)
     
 
-def all_ships_sunk(ships, guesses):
-    return all(all(guesses[r, c] == 1 for r, c in ship) for ship in ships)
\ No newline at end of file
+def prune_sunk_hits(
+    hits: list[tuple[int, int]],
+    fleet: BoardState,
+    ship: int,
+    targeting: TargetingState | None = None,
+) -> None:
+    """
+    Drop the cells of *ship*, which has just been sunk, from the live *hits*
+    so they stop steering the targeting, and turn them into misses in
+    *targeting* if one is kept.
+    """
+    pruned = [cell for cell in fleet.ship_cells(ship) if cell in hits]
+    for cell in pruned:
+        hits.remove(cell)
+    if targeting is not None:
+        targeting.record_sunk(pruned)
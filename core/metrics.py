@@ -0,0 +1,137 @@
+"""
+Lightweight timers and counters for the request hot path.
+
+Enable with ``BATTLESHIPS_METRICS=1``. When disabled, :func:`timer` returns a
+shared no-op context manager and :func:`incr` returns at once, so the
+instrumentation costs one global lookup per call site.
+
+Set ``BATTLESHIPS_METRICS_FILE`` to also export the process totals in
+Prometheus text format (rewritten at most every few seconds).
+"""
+import contextlib
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("BATTLESHIPS_METRICS", "") not in ("", "0")
+EXPORT_PATH = os.environ.get("BATTLESHIPS_METRICS_FILE")
+EXPORT_INTERVAL = 5.0
+
+_NULL = contextlib.nullcontext()
+
+
+class Metrics:
+    """Per-stage call counts and timings plus free-form counters."""
+
+    __slots__ = ("stages", "counters", "_lock")
+
+    def __init__(self):
+        self.stages: dict[str, list[float]] = {}  # name -> [calls, total_s, max_s]
+        self.counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                self.stages[name] = [1, seconds, seconds]
+            else:
+                stage[0] += 1
+                stage[1] += seconds
+                if seconds > stage[2]:
+                    stage[2] = seconds
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def rows(self) -> list[dict]:
+        """Stage summaries for display, slowest total first."""
+        with self._lock:
+            items = sorted(self.stages.items(), key=lambda kv: -kv[1][1])
+            return [
+                {
+                    "stage": name,
+                    "calls": int(calls),
+                    "total_ms": total * 1000,
+                    "mean_ms": total / calls * 1000,
+                    "max_ms": peak * 1000,
+                }
+                for name, (calls, total, peak) in items
+            ]
+
+
+PROCESS = Metrics()
+
+
+class _Timer:
+    __slots__ = ("name", "targets", "start")
+
+    def __init__(self, name: str, targets: tuple[Metrics, ...]):
+        self.name = name
+        self.targets = targets
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        for metrics in self.targets:
+            metrics.observe(self.name, elapsed)
+        return False
+
+
+def timer(name: str, session: Metrics | None = None):
+    """Time a ``with`` block into the process totals and, if given, a session."""
+    if not ENABLED:
+        return _NULL
+    return _Timer(name, (PROCESS, session) if session is not None else (PROCESS,))
+
+
+def incr(name: str, n: int = 1, session: Metrics | None = None) -> None:
+    if not ENABLED:
+        return
+    PROCESS.incr(name, n)
+    if session is not None:
+        session.incr(name, n)
+
+
+# ----------------------------------------------------------------------------- #
+# Prometheus export                                                             #
+# ----------------------------------------------------------------------------- #
+def render_prometheus(metrics: Metrics = PROCESS) -> str:
+    lines = [
+        "# TYPE battleships_stage_calls_total counter",
+        "# TYPE battleships_stage_seconds_total counter",
+        "# TYPE battleships_stage_seconds_max gauge",
+    ]
+    with metrics._lock:
+        for name, (calls, total, peak) in sorted(metrics.stages.items()):
+            label = f'{{stage="{name}"}}'
+            lines.append(f"battleships_stage_calls_total{label} {int(calls)}")
+            lines.append(f"battleships_stage_seconds_total{label} {total:.9f}")
+            lines.append(f"battleships_stage_seconds_max{label} {peak:.9f}")
+        if metrics.counters:
+            lines.append("# TYPE battleships_events_total counter")
+        for name, value in sorted(metrics.counters.items()):
+            lines.append(f'battleships_events_total{{event="{name}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+_last_export = 0.0
+
+
+def maybe_export() -> None:
+    """Rewrite ``BATTLESHIPS_METRICS_FILE`` if the export interval has passed."""
+    global _last_export
+    if not ENABLED or not EXPORT_PATH:
+        return
+    now = time.monotonic()
+    if now - _last_export < EXPORT_INTERVAL:
+        return
+    _last_export = now
+    tmp = f"{EXPORT_PATH}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, EXPORT_PATH)
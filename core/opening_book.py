@@ -0,0 +1,183 @@
+"""
+Opening book for the hunt phase.
+
+Before the first hit the heat-map depends only on the misses and the
+remaining fleet, so its best cells can be cached. Positions are reduced by
+the eight symmetries of the square board before hashing. An optional
+table built offline is memory-mapped and searched before computing.
+
+Build a table from the repository root, e.g.::
+
+    python -m core.opening_book --grid-size 10 --ships 5 4 3 3 2 --depth 2 --out book-10.npy
+"""
+import argparse
+import hashlib
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from core.ai import _build_probability_grid_np
+
+
+# ----------------------------------------------------------------------------- #
+# Canonical positions                                                           #
+# ----------------------------------------------------------------------------- #
+@lru_cache(maxsize=16)
+def symmetries(grid_size: int) -> np.ndarray:
+    """
+    The 8 rotations/reflections of the board as ``(8, N*N)`` index arrays:
+    ``board.ravel()[perm]`` is the transformed board.
+    """
+    idx = np.arange(grid_size * grid_size).reshape(grid_size, grid_size)
+    perms = []
+    for k in range(4):
+        rotated = np.rot90(idx, k)
+        perms += [rotated.ravel(), np.fliplr(rotated).ravel()]
+    perms = np.array(perms)
+    perms.setflags(write=False)
+    return perms
+
+
+def canonical(misses: np.ndarray, remaining_lengths: list[int]) -> tuple[int, np.ndarray]:
+    """
+    Return ``(key, perm)`` for a flat miss mask: a 64-bit hash of the
+    smallest symmetric image and the permutation that produces it.
+    """
+    n_cells = misses.size
+    grid_size = int(round(n_cells ** 0.5))
+    perms = symmetries(grid_size)
+    images = [np.packbits(misses[perm]).tobytes() for perm in perms]
+    best = min(range(len(images)), key=images.__getitem__)
+
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(grid_size.to_bytes(2, "little"))
+    digest.update(bytes(sorted(remaining_lengths)))
+    digest.update(images[best])
+    return int.from_bytes(digest.digest(), "little"), perms[best]
+
+
+def _best_mask(misses: np.ndarray, remaining_lengths: list[int]) -> np.ndarray | None:
+    grid_size = int(round(misses.size ** 0.5))
+    prob = _build_probability_grid_np(
+        misses.reshape(grid_size, grid_size).astype(int), [], remaining_lengths
+    ).ravel()
+    if prob.max() == 0:
+        return None
+    return prob == prob.max()
+
+
+# ----------------------------------------------------------------------------- #
+# Book                                                                          #
+# ----------------------------------------------------------------------------- #
+class OpeningBook:
+    """
+    LRU cache of hunt-phase best cells, backed by an optional on-disk table.
+
+    The table is a sorted structured ``.npy`` array (see :func:`build_table`)
+    opened with ``mmap_mode="r"``, so lookups are a binary search over pages
+    the OS keeps warm across processes.
+    """
+
+    def __init__(self, maxsize: int = 65_536, table_path: str | None = None):
+        self.maxsize = maxsize
+        self._cache: OrderedDict[int, np.ndarray | None] = OrderedDict()
+        self._lock = threading.Lock()
+        self._table = np.load(table_path, mmap_mode="r") if table_path else None
+
+    def best_cells(
+        self, computer_guesses: np.ndarray, remaining_lengths: list[int]
+    ) -> np.ndarray | None:
+        """
+        Flat indices of the highest-scoring cells, in row-major order, for a
+        board whose guesses are all misses. ``None`` if no placement fits.
+        """
+        misses = computer_guesses.ravel() == 1
+        key, perm = canonical(misses, remaining_lengths)
+
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                best = self._cache[key]
+            else:
+                best = self._lookup_table(key, misses.size)
+                if best is None:
+                    best = _best_mask(misses[perm], remaining_lengths)
+                self._cache[key] = best
+                if len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+
+        if best is None:
+            return None
+        # Canonical cell j is original cell perm[j].
+        return np.sort(perm[best])
+
+    def _lookup_table(self, key: int, n_cells: int) -> np.ndarray | None:
+        table = self._table
+        if table is None or not len(table):
+            return None
+        i = int(np.searchsorted(table["key"], np.uint64(key)))
+        if i == len(table) or int(table["key"][i]) != key:
+            return None
+        bits = np.unpackbits(np.asarray(table["best"][i]))[:n_cells]
+        return bits.astype(bool)
+
+
+_book: OpeningBook | None = None
+_book_lock = threading.Lock()
+
+
+def get_opening_book() -> OpeningBook:
+    """Process-wide book; ``BATTLESHIPS_OPENING_BOOK`` may name a table file."""
+    global _book
+    with _book_lock:
+        if _book is None:
+            _book = OpeningBook(table_path=os.environ.get("BATTLESHIPS_OPENING_BOOK"))
+        return _book
+
+
+# ----------------------------------------------------------------------------- #
+# Offline table builder                                                         #
+# ----------------------------------------------------------------------------- #
+def build_table(grid_size: int, ship_lengths: list[int], depth: int) -> np.ndarray:
+    """
+    Enumerate every position with up to *depth* misses and the full fleet
+    afloat, and return the sorted table of canonical keys and best cells.
+    """
+    n_cells = grid_size * grid_size
+    entries: dict[int, np.ndarray] = {}
+    for k in range(depth + 1):
+        for cells in itertools.combinations(range(n_cells), k):
+            misses = np.zeros(n_cells, dtype=bool)
+            misses[list(cells)] = True
+            key, perm = canonical(misses, ship_lengths)
+            if key in entries:
+                continue
+            best = _best_mask(misses[perm], ship_lengths)
+            if best is not None:
+                entries[key] = np.packbits(best)
+
+    dtype = [("key", "<u8"), ("best", "u1", ((n_cells + 7) // 8,))]
+    table = np.zeros(len(entries), dtype=dtype)
+    for i, key in enumerate(sorted(entries)):
+        table[i] = (key, entries[key])
+    return table
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Build an opening-book table.")
+    parser.add_argument("--grid-size", type=int, required=True)
+    parser.add_argument("--ships", type=int, nargs="+", required=True)
+    parser.add_argument("--depth", type=int, default=2, help="max misses per position")
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args(argv)
+
+    table = build_table(args.grid_size, args.ships, args.depth)
+    np.save(args.out, table)
+    print(f"{len(table)} positions written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+from functools import lru_cache
+
+import numpy as np
+
+
+# ----------------------------------------------------------------------------- #
+# Placement tables                                                              #
+# ----------------------------------------------------------------------------- #
+@lru_cache(maxsize=64)
+def placement_table(grid_size: int, length: int) -> np.ndarray:
+    """
+    Every horizontal and vertical placement of a ship of *length* on a
+    *grid_size* board, as a read-only ``(P, length)`` array of flat cell
+    indices (``r * grid_size + c``).
+
+    Rows are ordered like the original nested loops: all horizontal
+    placements row by row, then all vertical placements column by column.
+    The table is cached per ``(grid_size, length)`` and must not be mutated.
+    The cache is shared by all configs: beyond 64 distinct pairs the least
+    recently used tables are evicted and rebuilt on demand.
+    """
+    n = grid_size
+    if length > n:
+        cells = np.empty((0, length), dtype=np.intp)
+        cells.setflags(write=False)
+        return cells
+
+    span = np.arange(length)
+    starts = n - length + 1
+
+    # Horizontal: row r, columns c .. c+length-1 --------------------------------
+    r, c = np.meshgrid(np.arange(n), np.arange(starts), indexing="ij")
+    horizontal = (r.reshape(-1, 1) * n) + c.reshape(-1, 1) + span
+
+    # Vertical: column c, rows r .. r+length-1 ----------------------------------
+    c, r = np.meshgrid(np.arange(n), np.arange(starts), indexing="ij")
+    vertical = ((r.reshape(-1, 1) + span) * n) + c.reshape(-1, 1)
+
+    cells = np.concatenate([horizontal, vertical]).astype(np.intp)
+    cells.setflags(write=False)
+    return cells
+
+
+@lru_cache(maxsize=64)
+def cell_index(grid_size: int, length: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Inverse of :func:`placement_table`: which placements cross each cell.
+
+    Returned in CSR form ``(indptr, placement_ids)`` – the placements
+    covering flat cell ``i`` are ``placement_ids[indptr[i]:indptr[i + 1]]``.
+    A cell is crossed by at most ``2 * length`` placements.
+    """
+    cells = placement_table(grid_size, length)
+    flat = cells.ravel()
+    order = np.argsort(flat, kind="stable")
+    placement_ids = (order // max(length, 1)).astype(np.intp)
+    indptr = np.zeros(grid_size * grid_size + 1, dtype=np.intp)
+    np.cumsum(np.bincount(flat, minlength=grid_size * grid_size), out=indptr[1:])
+    indptr.setflags(write=False)
+    placement_ids.setflags(write=False)
+    return indptr, placement_ids
@@ -0,0 +1,262 @@
+"""
+Append-only replay log of played games and a headless replay runner.
+
+Every record is ``kind (1 byte) + game id (8 bytes)`` followed by:
+
+* ``S`` – start: ``u16`` length and :meth:`Game.to_bytes` once both fleets
+  are placed (this includes the game's seed),
+* ``P`` – player shot: ``u16`` cell,
+* ``C`` – computer shot: ``u16`` cell and ``u32`` decision latency in µs,
+* ``E`` – end: ``u8`` final phase.
+
+Each record is a single ``write`` to a file opened with ``O_APPEND``, so
+several processes can share one log and games may interleave. A truncated
+final record (crash mid-write) is ignored by the reader.
+
+Replay a log against the current targeting code, from the repository root::
+
+    python -m core.replay games.replay
+    python -m core.replay games.replay --mode exact --json
+"""
+import argparse
+import json
+import os
+import struct
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+
+import numpy as np
+from core import engine
+from core.engine import PHASES, Game
+
+_RECORD = struct.Struct("<cQ")
+_START = struct.Struct("<H")
+_PLAYER = struct.Struct("<H")
+_COMPUTER = struct.Struct("<HI")
+_END = struct.Struct("<B")
+
+
+# ----------------------------------------------------------------------------- #
+# Writer                                                                        #
+# ----------------------------------------------------------------------------- #
+class ReplayLog:
+    """Append moves to *path*; safe to share between threads and processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def _append(self, kind: bytes, game_id: int, payload: bytes) -> None:
+        os.write(self._fd, _RECORD.pack(kind, game_id) + payload)
+
+    def start(self, game_id: int, game: Game) -> None:
+        data = game.to_bytes()
+        self._append(b"S", game_id, _START.pack(len(data)) + data)
+
+    def player_shot(self, game_id: int, r: int, c: int, grid_size: int) -> None:
+        self._append(b"P", game_id, _PLAYER.pack(r * grid_size + c))
+
+    def computer_shot(self, game_id: int, r: int, c: int, grid_size: int, latency_ns: int) -> None:
+        latency_us = min(latency_ns // 1000, 0xFFFFFFFF)
+        self._append(b"C", game_id, _COMPUTER.pack(r * grid_size + c, latency_us))
+
+    def end(self, game_id: int, phase: str) -> None:
+        self._append(b"E", game_id, _END.pack(PHASES.index(phase)))
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+_log: ReplayLog | None = None
+_log_lock = threading.Lock()
+
+
+def get_replay_log() -> ReplayLog | None:
+    """Process-wide log at ``BATTLESHIPS_REPLAY_LOG``, or ``None`` if unset."""
+    global _log
+    path = os.environ.get("BATTLESHIPS_REPLAY_LOG")
+    if not path:
+        return None
+    with _log_lock:
+        if _log is None:
+            _log = ReplayLog(path)
+        return _log
+
+
+# ----------------------------------------------------------------------------- #
+# Reader                                                                        #
+# ----------------------------------------------------------------------------- #
+@dataclass
+class LoggedGame:
+    game_id: int
+    start: bytes
+    player_shots: list[int] = field(default_factory=list)
+    computer_shots: list[int] = field(default_factory=list)
+    latencies_us: list[int] = field(default_factory=list)
+    result: str | None = None  # None while unfinished
+
+
+def read_games(path: str) -> Iterator[LoggedGame]:
+    """Yield the games in *path* in the order they started."""
+    with open(path, "rb") as f:
+        data = f.read()
+
+    games: dict[int, LoggedGame] = {}
+    offset = 0
+    try:
+        while offset < len(data):
+            kind, game_id = _RECORD.unpack_from(data, offset)
+            offset += _RECORD.size
+            if kind == b"S":
+                (size,) = _START.unpack_from(data, offset)
+                offset += _START.size
+                start = data[offset:offset + size]
+                if len(start) < size:
+                    break
+                offset += size
+                games[game_id] = LoggedGame(game_id, start)
+                continue
+            game = games.get(game_id)
+            if kind == b"P":
+                (cell,) = _PLAYER.unpack_from(data, offset)
+                offset += _PLAYER.size
+                if game is not None:
+                    game.player_shots.append(cell)
+            elif kind == b"C":
+                cell, latency = _COMPUTER.unpack_from(data, offset)
+                offset += _COMPUTER.size
+                if game is not None:
+                    game.computer_shots.append(cell)
+                    game.latencies_us.append(latency)
+            elif kind == b"E":
+                (phase,) = _END.unpack_from(data, offset)
+                offset += _END.size
+                if game is not None:
+                    game.result = PHASES[phase]
+            else:
+                raise ValueError(f"Corrupt replay log {path!r} at byte {offset - _RECORD.size}")
+    except struct.error:
+        pass  # truncated final record
+    yield from games.values()
+
+
+# ----------------------------------------------------------------------------- #
+# Runner                                                                        #
+# ----------------------------------------------------------------------------- #
+def replay_game(logged: LoggedGame, **targeting) -> dict:
+    """
+    Re-run the computer's side of *logged* from its start position.
+
+    The computer's choices never depend on the player's shots, so the
+    replay fires the computer, with its original per-move seeds and the
+    given *targeting* options for ``get_computer_target``, until the
+    player's fleet is sunk. The result is then derived from when the player
+    finished in the log: they win if their winning shot came no later than
+    the computer's last.
+    """
+    game = Game.from_bytes(logged.start)
+    n = game.config.grid_size
+
+    shots, latencies_us = [], []
+    while game.phase == "playing":
+        start = time.perf_counter_ns()
+        r, c = engine.computer_target(game, **targeting)
+        latencies_us.append((time.perf_counter_ns() - start) / 1000)
+        engine.computer_turn(game, (r, c))
+        shots.append(r * n + c)
+
+    # The log stops early when the player won, so compare its moves only.
+    diverged_at = next(
+        (i for i, (a, b) in enumerate(zip(shots, logged.computer_shots)) if a != b), None
+    )
+    if diverged_at is None and len(shots) < len(logged.computer_shots):
+        diverged_at = len(shots)
+
+    player_shots = len(logged.player_shots)
+    if logged.result == "won":
+        result = "won" if player_shots <= len(shots) else "lost"
+    else:
+        result = "lost" if len(shots) <= player_shots else None
+    return {
+        "game_id": logged.game_id,
+        "reproduced": diverged_at is None,
+        "diverged_at": diverged_at,
+        "logged_result": logged.result,
+        "replayed_result": result,
+        "logged_computer_shots": len(logged.computer_shots),
+        "replayed_computer_shots": len(shots),
+        "logged_latency_us": logged.latencies_us,
+        "replayed_latency_us": latencies_us,
+    }
+
+
+def _percentiles(values: list[float]) -> dict:
+    if not values:
+        return {}
+    us = np.asarray(values, dtype=float)
+    return {
+        "mean_us": float(us.mean()),
+        "p50_us": float(np.percentile(us, 50)),
+        "p99_us": float(np.percentile(us, 99)),
+    }
+
+
+def summarise(results: list[dict]) -> dict:
+    finished = [r for r in results if r["logged_result"] == "lost"]
+    changed = [
+        r for r in results
+        if r["replayed_result"] is not None and r["logged_result"] in ("won", "lost")
+        and r["replayed_result"] != r["logged_result"]
+    ]
+    return {
+        "games": len(results),
+        "reproduced": sum(r["reproduced"] for r in results),
+        "results_changed": len(changed),
+        # Only lost games show how many shots the logged computer needed.
+        "mean_shots_logged": float(np.mean([r["logged_computer_shots"] for r in finished])) if finished else None,
+        "mean_shots_replayed": float(np.mean([r["replayed_computer_shots"] for r in finished])) if finished else None,
+        "latency_logged": _percentiles([x for r in results for x in r["logged_latency_us"]]),
+        "latency_replayed": _percentiles([x for r in results for x in r["replayed_latency_us"]]),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay logged games without the UI.")
+    parser.add_argument("log")
+    parser.add_argument(
+        "--engine", choices=["incremental", "numpy", "python"], default="incremental"
+    )
+    parser.add_argument("--mode", choices=["heuristic", "exact"], default="heuristic")
+    parser.add_argument("--time-budget", type=float, default=0.1)
+    parser.add_argument("--book", action="store_true", help="use the opening book")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    targeting = {"engine": args.engine, "mode": args.mode, "time_budget": args.time_budget}
+    if args.book:
+        from core.opening_book import get_opening_book
+
+        targeting["book"] = get_opening_book()
+    summary = summarise([replay_game(g, **targeting) for g in read_games(args.log)])
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    print(f"games               {summary['games']}")
+    print(f"reproduced exactly  {summary['reproduced']}")
+    print(f"results changed     {summary['results_changed']}")
+    if summary["mean_shots_logged"] is not None:
+        print(
+            f"shots to win        {summary['mean_shots_logged']:.2f} logged, "
+            f"{summary['mean_shots_replayed']:.2f} replayed"
+        )
+    for side in ("logged", "replayed"):
+        lat = summary[f"latency_{side}"]
+        if lat:
+            print(f"latency {side:9s}   p50 {lat['p50_us']:.1f} us, p99 {lat['p99_us']:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
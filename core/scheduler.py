@@ -0,0 +1,86 @@
+"""
+Off-thread computation of the computer's reply.
+
+The computer's next target depends only on its own guesses, live hits and
+the remaining fleet, none of which change while the player is deciding.
+:class:`MoveScheduler` starts that computation as soon as the previous
+turn ends, keyed by a fingerprint of those inputs, so the reply is usually
+ready by the time the player clicks.
+"""
+import os
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+
+import numpy as np
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def shared_executor() -> ThreadPoolExecutor:
+    """Process-wide worker pool shared by every session's scheduler."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=os.cpu_count() or 1, thread_name_prefix="computer-move"
+            )
+        return _executor
+
+
+def move_key(
+    computer_guesses: np.ndarray,
+    computer_hits: list[tuple[int, int]],
+    remaining_lengths: list[int],
+) -> tuple:
+    """Fingerprint of everything the computer's choice depends on."""
+    return (computer_guesses.tobytes(), tuple(computer_hits), tuple(remaining_lengths))
+
+
+class MoveScheduler:
+    """
+    One speculative computer move per game.
+
+    * :meth:`speculate` starts computing the move for *key* in the pool.
+    * :meth:`take` returns that move if *key* still matches, otherwise it
+      waits for the stale job to stop touching shared state and returns
+      ``None`` so the caller computes the move itself.
+    """
+
+    __slots__ = ("_executor", "_key", "_future")
+
+    def __init__(self, executor: Executor | None = None):
+        self._executor = executor
+        self._key: tuple | None = None
+        self._future: Future | None = None
+
+    def has(self, key: tuple) -> bool:
+        return self._future is not None and self._key == key
+
+    def speculate(self, key: tuple, fn, *args, **kwargs) -> None:
+        """Start ``fn(*args, **kwargs)`` for *key*, dropping any older job."""
+        if self.has(key):
+            return
+        self.cancel()
+        executor = self._executor or shared_executor()
+        self._key = key
+        self._future = executor.submit(fn, *args, **kwargs)
+
+    def take(self, key: tuple):
+        """Result of the job for *key*, or ``None`` if there is none."""
+        future, matches = self._future, self.has(key)
+        self._key = self._future = None
+        if future is None:
+            return None
+        if not matches:
+            if not future.cancel():
+                future.exception()  # wait: it may still read the targeting state
+            return None
+        return future.result()
+
+    def cancel(self) -> None:
+        """Invalidate the pending job (waiting for it if already running)."""
+        future = self._future
+        self._key = self._future = None
+        if future is not None and not future.cancel():
+            future.exception()
@@ -0,0 +1,205 @@
+"""
+Headless self-play: the computer player against random fleets.
+
+Run from the repository root, e.g.::
+
+    python -m core.simulator --games 1000000 --grid-size 10 --ships 5 4 3 3 2
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import time
+
+import numpy as np
+from core.ai import get_computer_target
+from core.bitboard import BoardState
+from core.config import GameConfig, grid_size, ship_lengths
+from core.game_logic import place_opponent_ships, prune_sunk_hits
+from core.targeting import TargetingState
+
+
+# ----------------------------------------------------------------------------- #
+# Single game                                                                   #
+# ----------------------------------------------------------------------------- #
+def play_game(
+    grid_size: int = grid_size,
+    ship_lengths: list[int] = ship_lengths,
+    engine: str = "incremental",
+    mode: str = "heuristic",
+) -> int:
+    """
+    Let the computer sink one random fleet and return the shots it needed.
+    *engine* is passed to ``get_computer_target``; only ``"incremental"``
+    keeps a per-game targeting state.
+    """
+    _, ships = place_opponent_ships(GameConfig(grid_size, ship_lengths))
+    fleet = BoardState.from_ships(ships, grid_size)
+    guesses = np.zeros((grid_size, grid_size), dtype=int)
+    hits: list[tuple[int, int]] = []
+    targeting = TargetingState(grid_size) if engine == "incremental" else None
+
+    shots = 0
+    while not fleet.all_sunk():
+        if shots == grid_size * grid_size:
+            raise RuntimeError("Computer ran out of cells without sinking the fleet.")
+        r, c = get_computer_target(
+            hits,
+            guesses,
+            grid_size,
+            remaining_lengths=fleet.remaining_lengths(),
+            engine=engine,
+            state=targeting,
+            mode=mode,
+        )
+        guesses[r, c] = 1
+        shots += 1
+        hit_ship = fleet.fire(r, c)
+        if targeting is not None:
+            targeting.record_shot(r, c, hit_ship is not None)
+        if hit_ship is not None:
+            hits.append((r, c))
+            if fleet.is_sunk(hit_ship):
+                prune_sunk_hits(hits, fleet, hit_ship, targeting)
+    return shots
+
+
+def _run_shard(task: tuple[int, int, int, list[int], str, str]) -> np.ndarray:
+    """Play one shard of games and return its shots-to-win histogram."""
+    seed, n_games, grid_size, ship_lengths, engine, mode = task
+    # The AI and fleet placement draw from the global RNGs.
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+
+    histogram = np.zeros(grid_size * grid_size + 1, dtype=np.int64)
+    for _ in range(n_games):
+        histogram[play_game(grid_size, ship_lengths, engine, mode)] += 1
+    return histogram
+
+
+# ----------------------------------------------------------------------------- #
+# Batch driver                                                                  #
+# ----------------------------------------------------------------------------- #
+def simulate(
+    n_games: int,
+    grid_size: int = grid_size,
+    ship_lengths: list[int] = ship_lengths,
+    workers: int | None = None,
+    seed: int = 0,
+    shard_size: int = 1000,
+    engine: str = "incremental",
+    mode: str = "heuristic",
+) -> dict:
+    """
+    Play *n_games* across a process pool and summarise the results.
+
+    Games are split into shards of *shard_size*; every shard gets its own
+    seed spawned from *seed*, so the histogram is reproducible regardless of
+    the number of workers or the order in which shards finish.
+    """
+    n_shards = -(-n_games // shard_size)
+    seeds = [
+        int(s.generate_state(1, dtype=np.uint64)[0])
+        for s in np.random.SeedSequence(seed).spawn(n_shards)
+    ]
+    tasks = [
+        (
+            seeds[i],
+            min(shard_size, n_games - i * shard_size),
+            grid_size,
+            list(ship_lengths),
+            engine,
+            mode,
+        )
+        for i in range(n_shards)
+    ]
+
+    workers = workers or multiprocessing.cpu_count()
+    histogram = np.zeros(grid_size * grid_size + 1, dtype=np.int64)
+    start = time.perf_counter()
+    if workers == 1:
+        for task in tasks:
+            histogram += _run_shard(task)
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            for shard in pool.imap_unordered(_run_shard, tasks):
+                histogram += shard
+    elapsed = time.perf_counter() - start
+
+    return _summarise(histogram, elapsed, workers)
+
+
+def _summarise(histogram: np.ndarray, elapsed: float, workers: int) -> dict:
+    n_games = int(histogram.sum())
+    shots = np.arange(histogram.size)
+    cumulative = np.cumsum(histogram)
+
+    def percentile(q: float) -> int:
+        return int(np.searchsorted(cumulative, q / 100 * n_games))
+
+    mean = float((shots * histogram).sum() / n_games)
+    return {
+        "games": n_games,
+        "workers": workers,
+        "seconds": elapsed,
+        "games_per_second": n_games / elapsed if elapsed else float("inf"),
+        "shots": {
+            "mean": mean,
+            "std": float(np.sqrt((histogram * (shots - mean) ** 2).sum() / n_games)),
+            "min": int(np.flatnonzero(histogram)[0]),
+            "p50": percentile(50),
+            "p90": percentile(90),
+            "p99": percentile(99),
+            "max": int(np.flatnonzero(histogram)[-1]),
+        },
+        "histogram": {int(k): int(histogram[k]) for k in np.flatnonzero(histogram)},
+    }
+
+
+# ----------------------------------------------------------------------------- #
+# CLI                                                                           #
+# ----------------------------------------------------------------------------- #
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--games", type=int, default=10_000)
+    parser.add_argument("--grid-size", type=int, default=grid_size)
+    parser.add_argument("--ships", type=int, nargs="+", default=ship_lengths)
+    parser.add_argument("--workers", type=int, default=None, help="default: all cores")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shard-size", type=int, default=1000)
+    parser.add_argument(
+        "--engine", choices=["incremental", "numpy", "python"], default="incremental"
+    )
+    parser.add_argument("--mode", choices=["heuristic", "exact"], default="heuristic")
+    parser.add_argument("--json", action="store_true", help="print the raw report")
+    args = parser.parse_args(argv)
+
+    report = simulate(
+        args.games,
+        grid_size=args.grid_size,
+        ship_lengths=args.ships,
+        workers=args.workers,
+        seed=args.seed,
+        shard_size=args.shard_size,
+        engine=args.engine,
+        mode=args.mode,
+    )
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    shots = report["shots"]
+    print(
+        f"{report['games']} games on {args.grid_size}x{args.grid_size} "
+        f"{args.ships} with {report['workers']} workers in {report['seconds']:.2f}s "
+        f"({report['games_per_second']:.1f} games/s)"
+    )
+    print(
+        f"shots to win: mean {shots['mean']:.2f} ± {shots['std']:.2f}, "
+        f"min {shots['min']}, p50 {shots['p50']}, p90 {shots['p90']}, "
+        f"p99 {shots['p99']}, max {shots['max']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import numpy as np
+from core.placements import cell_index, placement_table
+
+
+# ----------------------------------------------------------------------------- #
+# Incremental heat-map state                                                    #
+# ----------------------------------------------------------------------------- #
+class TargetingState:
+    """
+    Per-game heat-map state that is updated one shot at a time.
+
+    For every ship length it keeps how many misses each placement crosses and
+    the per-cell count of miss-free placements. A shot only touches the
+    placements that cross the fired cell, so an update costs ``O(length²)``
+    instead of a full board scan.
+
+    The state must see every shot (:meth:`record_shot`) and every sunk ship
+    (:meth:`record_sunk`) in the same order as ``computer_guesses`` and
+    ``computer_hits``; :meth:`probability_grid` then equals
+    ``core.ai._build_probability_grid`` for those inputs.
+    """
+
+    __slots__ = ("grid_size", "_guessed", "_hits", "_n_hits", "_lengths")
+
+    def __init__(self, grid_size: int):
+        self.grid_size = grid_size
+        self._guessed = np.zeros(grid_size * grid_size, dtype=bool)
+        self._hits = np.zeros(grid_size * grid_size, dtype=bool)
+        self._n_hits = 0
+        # length -> (misses crossed per placement, miss-free placements per cell)
+        self._lengths: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+
+    @classmethod
+    def from_board(
+        cls,
+        computer_guesses: np.ndarray,
+        hits: list[tuple[int, int]],
+    ) -> "TargetingState":
+        """Build a state that matches an existing guess board and live hits."""
+        n = computer_guesses.shape[0]
+        state = cls(n)
+        state._guessed[:] = computer_guesses.ravel() == 1
+        for r, c in hits:
+            state._hits[r * n + c] = True
+        state._n_hits = int(state._hits.sum())
+        return state
+
+    # ------------------------------------------------------------------------- #
+    # Updates                                                                   #
+    # ------------------------------------------------------------------------- #
+    def record_shot(self, r: int, c: int, hit: bool) -> None:
+        """Register a computer shot at ``(r, c)``."""
+        idx = r * self.grid_size + c
+        if self._guessed[idx]:
+            return
+        self._guessed[idx] = True
+        if hit:
+            self._hits[idx] = True
+            self._n_hits += 1
+        else:
+            self._add_miss(idx)
+
+    def record_sunk(self, cells: list[tuple[int, int]]) -> None:
+        """Turn the live hits of a sunk ship into plain misses."""
+        for r, c in cells:
+            idx = r * self.grid_size + c
+            if self._hits[idx]:
+                self._hits[idx] = False
+                self._n_hits -= 1
+                self._add_miss(idx)
+
+    def _add_miss(self, idx: int) -> None:
+        n = self.grid_size
+        for length, (miss_count, counts) in self._lengths.items():
+            indptr, placement_ids = cell_index(n, length)
+            crossing = placement_ids[indptr[idx]:indptr[idx + 1]]
+            newly_blocked = crossing[miss_count[crossing] == 0]
+            if newly_blocked.size:
+                cells = placement_table(n, length)[newly_blocked]
+                counts -= np.bincount(cells.ravel(), minlength=n * n)
+            miss_count[crossing] += 1
+
+    def _length_state(self, length: int) -> tuple[np.ndarray, np.ndarray]:
+        """Lazily build the tables for a length the state has not seen yet."""
+        if length not in self._lengths:
+            n = self.grid_size
+            cells = placement_table(n, length)
+            misses = self._guessed & ~self._hits
+            miss_count = misses[cells].sum(axis=1)
+            counts = np.bincount(
+                cells[miss_count == 0].ravel(), minlength=n * n
+            ).astype(int)
+            self._lengths[length] = (miss_count, counts)
+        return self._lengths[length]
+
+    # ------------------------------------------------------------------------- #
+    # Queries                                                                   #
+    # ------------------------------------------------------------------------- #
+    def probability_grid(self, remaining_lengths: list[int]) -> np.ndarray:
+        """
+        Heat-map for *remaining_lengths*, identical to a full rebuild.
+
+        * **Hunt mode** – sum of the maintained per-length counts.
+        * **Target mode** – every legal placement must cover all live hits,
+          so only the placements crossing one of them are examined.
+        """
+        n = self.grid_size
+        prob = np.zeros(n * n, dtype=int)
+
+        if self._n_hits:
+            anchor = int(np.flatnonzero(self._hits)[0])
+            for length in remaining_lengths:
+                miss_count, _ = self._length_state(length)
+                indptr, placement_ids = cell_index(n, length)
+                crossing = placement_ids[indptr[anchor]:indptr[anchor + 1]]
+                crossing = crossing[miss_count[crossing] == 0]
+                cells = placement_table(n, length)[crossing]
+                legal = self._hits[cells].sum(axis=1) == self._n_hits
+                prob += np.bincount(cells[legal].ravel(), minlength=n * n)
+        else:
+            for length in remaining_lengths:
+                prob += self._length_state(length)[1]
+
+        prob[self._guessed] = 0
+        return prob.reshape(n, n)
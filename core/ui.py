@@ -1,37 +1,91 @@
 from __future__ import annotations
 
+import functools
+import time
+
+import numpy as np
 import streamlit as st
-from core.config import grid_size, ship_lengths
-from core.game_logic import is_valid_ship_selection, all_ships_sunk
-from core.ai import get_computer_target
-import csv
+from streamlit.errors import StreamlitAPIException
+from core import engine
+from core.metrics import Metrics, incr, maybe_export, timer
+from core.opening_book import get_opening_book
+from core.replay import get_replay_log
+from core.scheduler import move_key
+from ml.datalog import get_logger
 
 
 # -----------------------------------------------------------------------------
 # Helper utilities                                                              
 # -----------------------------------------------------------------------------
 
-def _remaining_lengths(player_ships: list[list[tuple[int, int]]], guesses) -> list[int]:
-    """Lengths of the player’s ships that are not yet fully guessed."""
-    lengths = [
-        len(ship)
-        for ship in player_ships
-        if not all(guesses[r, c] == 1 for r, c in ship)
-    ]
-    return lengths or [1]  # never return empty list
-
-
-def _prune_sunk_hits(
-    computer_hits: list[tuple[int, int]],
-    player_ships: list[list[tuple[int, int]]],
-    guesses,
-) -> None:
-    """Remove any hit cells that belong to ships that have just been sunk."""
-    for ship in player_ships:
-        if all(guesses[r, c] == 1 for r, c in ship):
-            for cell in ship:
-                if cell in computer_hits:
-                    computer_hits.remove(cell)
+# Boards are drawn inside fragments so a click that only affects one board
+# reruns just that board (Streamlit >= 1.37); older versions run them inline.
+_fragment = getattr(st, "fragment", None) or (lambda func: func)
+
+
+def _rerun_board():
+    """Rerun only the current board fragment, or the whole app outside one."""
+    if hasattr(st, "fragment"):
+        try:
+            st.rerun(scope="fragment")
+        except StreamlitAPIException:  # not inside a fragment rerun
+            pass
+    st.rerun()
+
+
+def _session_metrics() -> Metrics:
+    """Timings for this browser session, shown in the debug panel."""
+    if "metrics" not in st.session_state:
+        st.session_state.metrics = Metrics()
+    return st.session_state.metrics
+
+
+def _timed(name: str):
+    """Time every run of a render function under *name*."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(name, _session_metrics()):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _speculate_computer_move() -> None:
+    """Start computing the computer's next move while the player decides."""
+    game = st.session_state.game
+    st.session_state.scheduler.speculate(
+        _game_move_key(game), engine.computer_target, game, book=get_opening_book()
+    )
+
+
+def _game_move_key(game: engine.Game) -> tuple:
+    return move_key(
+        game.computer_guesses, game.computer_hits, game.player.remaining_lengths()
+    )
+
+
+def player_board_labels(
+    player_board: np.ndarray,
+    computer_guesses: np.ndarray,
+    current_ship_cells: list[tuple[int, int]],
+    placing: bool,
+) -> np.ndarray:
+    """Button labels for the player's grid, computed in one vectorised pass."""
+    ship = player_board == 1
+    if placing:
+        selected = np.zeros_like(ship)
+        for r, c in current_ship_cells:
+            selected[r, c] = True
+        return np.select([ship, selected], ["🚢", "✅"], " ")
+    guessed = computer_guesses == 1
+    return np.select([guessed & ship, guessed, ship], ["💥", "❌", "🚢"], " ")
+
+
+def opponent_board_labels(opponent_board: np.ndarray, guesses: np.ndarray) -> np.ndarray:
+    """Button labels for the opponent's grid; unguessed cells stay blank."""
+    guessed = guesses == 1
+    return np.select([guessed & (opponent_board == 1), guessed], ["✅", "❌"], " ")
 
 
 # -----------------------------------------------------------------------------
@@ -43,24 +97,29 @@ def title_and_message():
     st.write(st.session_state.message)
 
 
+@_fragment
+@_timed("ui.render_player_board")
 def render_player_board():
     """Draw the player's own grid and handle ship placement."""
+    game = st.session_state.game
+    grid_size, ship_lengths = game.config.grid_size, game.config.ship_lengths
+    placing = game.phase == "placing"
+    labels = player_board_labels(
+        game.player.fleet_array(),
+        game.computer_guesses,
+        st.session_state.current_ship_cells,
+        placing,
+    )
     for row in range(grid_size):
         cols = st.columns(grid_size)
         for col in range(grid_size):
             key = f"cell_{row}_{col}"
+            label = labels[row, col]
 
             # -----------------------------------------------------------------
             # Placement phase --------------------------------------------------
             # -----------------------------------------------------------------
-            if st.session_state.phase == "placing":
-                if st.session_state.player_board[row, col] == 1:
-                    label = "🚢"
-                elif (row, col) in st.session_state.current_ship_cells:
-                    label = "✅"
-                else:
-                    label = " "
-
+            if placing:
                 if cols[col].button(label, key=key):
                     # -- Ignore re‑click on the same cell ---------------------
                     if (row, col) in st.session_state.current_ship_cells:
@@ -68,41 +127,32 @@ def render_player_board():
 
                     # -- Register the click -----------------------------------
                     st.session_state.current_ship_cells.append((row, col))
-                    required = ship_lengths[st.session_state.current_ship_index]
+                    required = ship_lengths[len(game.player.ship_masks)]
+
+                    # -- Ship still incomplete: only this board changes -------
+                    if len(st.session_state.current_ship_cells) < required:
+                        _rerun_board()
 
                     # -- Ship complete? ---------------------------------------
-                    if len(st.session_state.current_ship_cells) == required:
-                        if is_valid_ship_selection(st.session_state.current_ship_cells):
-                            # Commit the ship to the board/state
-                            for r, c in st.session_state.current_ship_cells:
-                                st.session_state.player_board[r, c] = 1
-                            st.session_state.player_ships.append(
-                                st.session_state.current_ship_cells
+                    try:
+                        engine.place(game, st.session_state.current_ship_cells)
+                    except ValueError as exc:
+                        st.session_state.error = f"❌ {exc}"
+                    else:
+                        st.session_state.error = ""
+                        if game.phase == "playing":
+                            replay = get_replay_log()
+                            if replay is not None:
+                                replay.start(st.session_state.game_id, game)
+                            st.session_state.message = (
+                                "🎯 Start guessing: click on opponent's board!"
                             )
-                            st.session_state.current_ship_cells = []
-                            st.session_state.current_ship_index += 1
-                            st.session_state.error = ""
-
-                            if (
-                                st.session_state.current_ship_index
-                                == len(ship_lengths)
-                            ):
-                                st.session_state.phase = "playing"
-                                st.session_state.message = (
-                                    "🎯 Start guessing: click on opponent's board!"
-                                )
-                            else:
-                                next_len = ship_lengths[
-                                    st.session_state.current_ship_index
-                                ]
-                                st.session_state.message = (
-                                    f"Double-click {next_len} cells on your board to place your next ship."
-                                )
                         else:
-                            st.session_state.error = (
-                                "❌ Cells must be in a straight line and adjacent."
+                            next_len = ship_lengths[len(game.player.ship_masks)]
+                            st.session_state.message = (
+                                f"Double-click {next_len} cells on your board to place your next ship."
                             )
-                            st.session_state.current_ship_cells = []
+                    st.session_state.current_ship_cells = []
 
                     # -- Immediate visual feedback ---------------------------
                     st.rerun()
@@ -111,111 +161,93 @@ def render_player_board():
             # Gameplay / Endgame phases ---------------------------------------
             # -----------------------------------------------------------------
             else:
-                if st.session_state.computer_guesses[row, col] == 1:
-                    label = "💥" if st.session_state.player_board[row, col] == 1 else "❌"
-                elif st.session_state.player_board[row, col] == 1:
-                    label = "🚢"
-                else:
-                    label = " "
                 cols[col].button(label, key=key, disabled=True)
 
 
+@_fragment
+@_timed("ui.render_opponent_board")
 def render_opponent_board():
     """Draw the opponent grid and handle the player's firing clicks."""
     st.subheader("Opponent Board (click to guess)")
+    game = st.session_state.game
+    grid_size = game.config.grid_size
+    _speculate_computer_move()
+    guesses = game.opponent.shots_array()
+    labels = opponent_board_labels(game.opponent.fleet_array(), guesses)
     for row in range(grid_size):
         cols = st.columns(grid_size)
         for col in range(grid_size):
             key = f"opponent_{row}_{col}"
 
             # Already guessed --------------------------------------------------
-            if st.session_state.guesses[row, col] == 1:
-                label = (
-                    "✅"
-                    if any((row, col) in s for s in st.session_state.opponent_ships)
-                    else "❌"
-                )
-                cols[col].button(label, key=key, disabled=True)
+            if guesses[row, col] == 1:
+                cols[col].button(labels[row, col], key=key, disabled=True)
                 continue
 
             # Fresh cell -------------------------------------------------------
             if cols[col].button(" ", key=key):
+                metrics = _session_metrics()
+                incr("clicks", session=metrics)
+                replay = get_replay_log()
+                game_id = st.session_state.game_id
+
                 # -----------------------------------------------------------------
                 # 1) Player fires ---------------------------------------------------
                 # -----------------------------------------------------------------
-                st.session_state.guesses[row, col] = 1
-
-                hit_ship = next(
-                    (
-                        i
-                        for i, s in enumerate(st.session_state.opponent_ships)
-                        if (row, col) in s
-                    ),
-                    None,
-                )
-                if hit_ship is not None:
-                    st.session_state.message = f"🎯 Hit at ({row}, {col})! 💥"
-                    if all(
-                        st.session_state.guesses[r, c] == 1
-                        for r, c in st.session_state.opponent_ships[hit_ship]
-                    ):
-                        if hit_ship not in st.session_state.sunk_ships:
-                            st.session_state.sunk_ships.add(hit_ship)
+                with timer("ui.player_shot", metrics):
+                    shot = engine.fire(game, row, col)
+                    if replay is not None:
+                        replay.player_shot(game_id, row, col, grid_size)
+                    if shot.ship is not None:
+                        st.session_state.message = f"🎯 Hit at ({row}, {col})! 💥"
+                        if shot.sunk:
                             st.toast("🔥 You sunk a ship!", icon="🚢")
-                else:
-                    st.session_state.message = f"💦 Miss at ({row}, {col})!"
+                    else:
+                        st.session_state.message = f"💦 Miss at ({row}, {col})!"
 
                 # Win check ------------------------------------------------------
-                if all_ships_sunk(
-                    st.session_state.opponent_ships, st.session_state.guesses
-                ):
-                    st.session_state.phase = "won"
+                if game.phase == "won":
+                    st.session_state.scheduler.cancel()
+                    if replay is not None:
+                        replay.end(game_id, game.phase)
                     st.session_state.message = "🏆 You sank all opponent ships!"
                     st.rerun()
 
                 # -----------------------------------------------------------------
                 # 2) Computer fires ------------------------------------------------
                 # -----------------------------------------------------------------
-                remaining = _remaining_lengths(
-                    st.session_state.player_ships, st.session_state.computer_guesses
-                )
-                r, c = get_computer_target(
-                    st.session_state.computer_hits,
-                    st.session_state.computer_guesses,
-                    grid_size,
-                    remaining_lengths=remaining,
-                )
-                st.session_state.computer_guesses[r, c] = 1
-
-                # --- Log training data for DNN ---
-
-                with open("ml/dataset.csv", "a", newline="") as f:
-                    writer = csv.writer(f)
-                    board_flat = st.session_state.computer_guesses.flatten().astype(int).tolist()
-                    writer.writerow(board_flat + [r, c, int(st.session_state.player_board[r, c] == 1)])
-
-
-                if st.session_state.player_board[r, c] == 1:
-                    st.session_state.computer_hits.append((r, c))
-                    st.toast(f"🤖 Computer hit at ({r}, {c})! 💥", icon="💥")
+                with timer("ui.computer_target", metrics):
+                    started = time.perf_counter_ns()
+                    move = st.session_state.scheduler.take(_game_move_key(game))
+                    incr(
+                        "speculation_misses" if move is None else "speculation_hits",
+                        session=metrics,
+                    )
+                    if move is None:
+                        move = engine.computer_target(game, book=get_opening_book())
+                    latency_ns = time.perf_counter_ns() - started
+
+                # Shot resolution, sunk-hit pruning and the loss check ----------
+                with timer("ui.prune_and_loss_check", metrics):
+                    if replay is not None:
+                        replay.computer_shot(game_id, *move, grid_size, latency_ns)
+                    shot = engine.computer_turn(game, move)
+                    if game.phase == "lost":
+                        st.session_state.message = "💥 The computer sank all your ships! Game over."
+                        if replay is not None:
+                            replay.end(game_id, game.phase)
+
+                # --- Log training data for DNN (buffered, off-thread) ---
+                with timer("ui.dataset_log", metrics):
+                    get_logger().log(
+                        game.computer_guesses, shot.r, shot.c, shot.ship is not None
+                    )
+
+                if shot.ship is not None:
+                    st.toast(f"🤖 Computer hit at ({shot.r}, {shot.c})! 💥", icon="💥")
                 else:
-                    st.toast(f"🤖 Computer missed at ({r}, {c})!", icon="👻")
-
-                _prune_sunk_hits(
-                    st.session_state.computer_hits,
-                    st.session_state.player_ships,
-                    st.session_state.computer_guesses,
-                )
-
-                # Loss check -----------------------------------------------------
-                player_cells = [
-                    cell for ship in st.session_state.player_ships for cell in ship
-                ]
-                if all(
-                    st.session_state.computer_guesses[r, c] == 1 for r, c in player_cells
-                ):
-                    st.session_state.phase = "lost"
-                    st.session_state.message = "💥 The computer sank all your ships! Game over."
+                    st.toast(f"🤖 Computer missed at ({shot.r}, {shot.c})!", icon="👻")
 
                 # Immediate visual feedback ------------------------------------
+                maybe_export()
                 st.rerun()
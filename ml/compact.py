@@ -0,0 +1,257 @@
+# ml/compact.py
+"""
+Compact, deduplicated training set.
+
+Logged rows repeat heavily (every game starts from the same few boards), so
+the compactor reduces them to one record per distinct ``(board, r, c)``
+with the number of *trials* and *hits* seen for it. Boards are stored as
+packed bits. Records are sorted by board then target and saved as a
+structured ``.npy`` file that is read with ``mmap_mode="r"``.
+
+Training on ``hits / trials`` with sample weight ``trials`` gives the same
+binary cross-entropy as training on every raw row.
+
+Run from the repository root::
+
+    python -m ml.compact --grid-size 5
+    python -m ml.compact --grid-size 5 --remove-sources   # fold logs in incrementally
+
+Each output has a ``.meta.json`` sidecar that records which of the two
+modes built it, so they are never mixed on one file.
+"""
+import argparse
+import itertools
+import json
+import os
+from collections.abc import Iterator
+
+import numpy as np
+from ml.datalog import CSV_PATH, SHARD_DIR, shard_paths
+
+try:  # POSIX only – the CSV writers hold this lock while appending
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+def compact_path_for(grid_size: int) -> str:
+    return f"ml/dataset-{grid_size}x{grid_size}.npy"
+
+
+def record_dtype(grid_size: int) -> np.dtype:
+    if grid_size > np.iinfo(np.uint8).max:
+        raise ValueError(f"Grid size {grid_size} does not fit the compact format")
+    return np.dtype([
+        ("board", "u1", ((grid_size * grid_size + 7) // 8,)),
+        ("r", "u1"),
+        ("c", "u1"),
+        ("hits", "<u4"),
+        ("trials", "<u4"),
+    ])
+
+
+# ----------------------------------------------------------------------------- #
+# Aggregation                                                                   #
+# ----------------------------------------------------------------------------- #
+def _reduce(keys: np.ndarray, hits: np.ndarray, trials: np.ndarray, grid_size: int) -> np.ndarray:
+    """Sum *hits* and *trials* per distinct row of *keys* (packed board + r + c)."""
+    dtype = record_dtype(grid_size)
+    width = keys.shape[1]
+    # Byte-string view: np.unique sorts it like memcmp, i.e. by board, r, c.
+    unique, inverse = np.unique(
+        np.ascontiguousarray(keys).view(f"V{width}").ravel(), return_inverse=True
+    )
+    unique = unique.view(np.uint8).reshape(-1, width)
+
+    table = np.zeros(len(unique), dtype=dtype)
+    table["board"] = unique[:, :-2]
+    table["r"] = unique[:, -2]
+    table["c"] = unique[:, -1]
+    table["hits"] = np.bincount(inverse.ravel(), weights=hits, minlength=len(unique))
+    table["trials"] = np.bincount(inverse.ravel(), weights=trials, minlength=len(unique))
+    return table
+
+
+def aggregate(rows: np.ndarray, grid_size: int) -> np.ndarray:
+    """Compact raw ``board + [r, c, hit]`` rows into sorted records."""
+    n_cells = grid_size * grid_size
+    board = np.packbits(rows[:, :n_cells] != 0, axis=1)
+    keys = np.column_stack([board, rows[:, n_cells:n_cells + 2].astype(np.uint8)])
+    return _reduce(keys, rows[:, -1], np.ones(len(rows)), grid_size)
+
+
+def merge(tables: list[np.ndarray], grid_size: int) -> np.ndarray:
+    """Combine compact tables, summing the counts of shared records."""
+    if not tables:
+        return np.zeros(0, dtype=record_dtype(grid_size))
+    table = np.concatenate(tables)
+    keys = np.column_stack([table["board"], table["r"], table["c"]])
+    return _reduce(keys, table["hits"], table["trials"], grid_size)
+
+
+# ----------------------------------------------------------------------------- #
+# Files                                                                         #
+# ----------------------------------------------------------------------------- #
+def load_compact(path: str, grid_size: int) -> np.ndarray:
+    """Memory-map a compact file, checking it was built for *grid_size*."""
+    table = np.load(path, mmap_mode="r")
+    if table.dtype != record_dtype(grid_size):
+        raise ValueError(f"{path} is not a compact dataset for {grid_size}x{grid_size} boards")
+    return table
+
+
+def iter_compact_chunks(
+    path: str, grid_size: int, chunk_rows: int = 65_536
+) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Yield ``(boards, hit_rate, trials)`` chunks: boards unpacked to
+    ``(rows, N*N)`` 0/1 arrays, the hit rate as the soft label and the trial
+    count as its weight.
+    """
+    table = load_compact(path, grid_size)
+    n_cells = grid_size * grid_size
+    for start in range(0, len(table), chunk_rows):
+        chunk = np.asarray(table[start:start + chunk_rows])
+        boards = np.unpackbits(chunk["board"], axis=1, count=n_cells)
+        trials = chunk["trials"].astype(np.float64)
+        yield boards, chunk["hits"] / trials, trials
+
+
+def _meta_path(out: str) -> str:
+    return f"{out}.meta.json"
+
+
+def _read_meta(out: str) -> dict | None:
+    """The sidecar of *out*, or ``None`` if there is no output yet."""
+    if not os.path.exists(out):
+        return None
+    try:
+        with open(_meta_path(out)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"mode": "unknown"}
+
+
+def _csv_size(csv_path: str) -> int:
+    """Size of the CSV up to its last complete row, taken under the writers' lock."""
+    if not os.path.exists(csv_path):
+        return 0
+    with open(csv_path) as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_SH)
+        try:
+            return os.fstat(f.fileno()).st_size
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _iter_csv_rows(
+    csv_path: str, width: int, start: int, end: int, chunk_rows: int
+) -> Iterator[np.ndarray]:
+    """Rows of *width* between byte offsets *start* and *end*; other widths are skipped."""
+    if end <= start:
+        return
+    with open(csv_path, "rb") as f:
+        f.seek(start)
+        lines = f.read(end - start).splitlines()
+    lines = [line for line in lines if line.count(b",") == width - 1]
+    for i in range(0, len(lines), chunk_rows):
+        yield np.loadtxt(lines[i:i + chunk_rows], delimiter=",", dtype=np.int16, ndmin=2)
+
+
+def _iter_shard_rows(paths: list[str], chunk_rows: int) -> Iterator[np.ndarray]:
+    for path in paths:
+        shard = np.load(path, mmap_mode="r")
+        for start in range(0, shard.shape[0], chunk_rows):
+            yield np.asarray(shard[start:start + chunk_rows])
+
+
+def compact(
+    grid_size: int,
+    out: str | None = None,
+    csv_path: str = CSV_PATH,
+    shard_dir: str = SHARD_DIR,
+    remove_sources: bool = False,
+    chunk_rows: int = 65_536,
+) -> dict:
+    """
+    Build the compact file for *grid_size* from the logged rows.
+
+    By default *out* is rebuilt from the CSV and every shard, which are
+    left alone. With *remove_sources* the logs are folded into the existing
+    *out* instead: the consumed shards are deleted, and the CSV, which may
+    be tracked or hold other board sizes, is kept but only read past the
+    offset recorded by the previous run. Either way no row is counted
+    twice. Raises ``ValueError`` if *out* was built by the other mode.
+    """
+    out = out or compact_path_for(grid_size)
+    mode = "incremental" if remove_sources else "rebuild"
+    meta = _read_meta(out)
+    if meta is not None and meta["mode"] != mode:
+        raise ValueError(
+            f"{out} was built in {meta['mode']} mode; compacting it in {mode} "
+            "mode would count rows twice or lose folded ones. Use another output."
+        )
+
+    width = grid_size * grid_size + 3
+    sources = [p for p in shard_paths(shard_dir) if np.load(p, mmap_mode="r").shape[1] == width]
+    csv_start = meta["csv_offset"] if remove_sources and meta is not None else 0
+    csv_end = _csv_size(csv_path)
+    if csv_end < csv_start:
+        raise ValueError(f"{csv_path} shrank since {out} was built; rebuild into another output.")
+
+    tables, pending, rows_in = [], 0, 0
+    # Rows appended after csv_end, and shards written after the listing
+    # above, are left for the next run.
+    chunks = itertools.chain(
+        _iter_csv_rows(csv_path, width, csv_start, csv_end, chunk_rows),
+        _iter_shard_rows(sources, chunk_rows),
+    )
+    for rows in chunks:
+        tables.append(aggregate(rows, grid_size))
+        rows_in += len(rows)
+        pending += len(tables[-1])
+        if pending > 4 * chunk_rows:  # keep memory bounded by distinct records
+            tables = [merge(tables, grid_size)]
+            pending = len(tables[0])
+    if remove_sources and meta is not None:
+        tables.append(np.array(load_compact(out, grid_size)))
+    table = merge(tables, grid_size)
+
+    tmp = f"{out}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, table)
+    with open(f"{tmp}.meta", "w") as f:
+        json.dump({"mode": mode, "csv_offset": csv_end}, f)
+    os.replace(tmp, out)
+    os.replace(f"{tmp}.meta", _meta_path(out))
+
+    if remove_sources:
+        for path in sources:
+            os.remove(path)
+    return {"rows": rows_in, "records": len(table), "bytes": os.path.getsize(out)}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compact the logged training data.")
+    parser.add_argument("--grid-size", type=int, default=5)
+    parser.add_argument("--out", help="default: ml/dataset-NxN.npy")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--shard-dir", default=SHARD_DIR)
+    parser.add_argument(
+        "--remove-sources",
+        action="store_true",
+        help="merge into the existing output and delete the consumed shards",
+    )
+    args = parser.parse_args(argv)
+
+    stats = compact(args.grid_size, args.out, args.csv, args.shard_dir, args.remove_sources)
+    print(
+        f"{stats['rows']} rows -> {stats['records']} records, "
+        f"{stats['bytes']} bytes in {args.out or compact_path_for(args.grid_size)}"
+    )
+
+
+if __name__ == "__main__":
+    main()
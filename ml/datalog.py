@@ -0,0 +1,287 @@
+# ml/datalog.py
+"""
+Buffered training-data logger for computer shots.
+
+Rows are ``board (N*N) + [r, c, hit]`` exactly like ``ml/dataset.csv``.
+They are collected in preallocated int8 buffers and handed to a background
+thread, which writes each full (or stale) buffer as its own ``.npy`` shard.
+Shard names carry the process id and a counter and are published with an
+atomic rename, so any number of processes can log into the same directory.
+"""
+import atexit
+import csv
+import glob
+import logging
+import os
+import queue
+import threading
+import time
+from collections.abc import Iterator
+
+import numpy as np
+
+CSV_PATH = "ml/dataset.csv"
+SHARD_DIR = "ml/shards"
+
+log = logging.getLogger(__name__)
+
+try:  # POSIX only – used to serialise CSV appends across processes
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+class TrainingLogger:
+    """
+    Collect rows in memory and flush them off the request path.
+
+    * ``fmt="npy"`` – int8 ``.npy`` shards of at most *batch_rows* rows.
+    * ``fmt="csv"`` – append to *csv_path* under an exclusive file lock.
+      Also used automatically for rows that do not fit in int8
+      (boards larger than 127×127).
+
+    A partially filled buffer is flushed after *flush_interval* seconds.
+    At most *max_pending* full buffers wait for the writer; beyond that the
+    oldest are dropped, as are buffers the writer fails to save, so a
+    broken disk costs training rows but never memory or a hung shutdown.
+    """
+
+    def __init__(
+        self,
+        shard_dir: str = SHARD_DIR,
+        csv_path: str = CSV_PATH,
+        fmt: str = "npy",
+        batch_rows: int = 4096,
+        flush_interval: float = 5.0,
+        max_pending: int = 64,
+    ):
+        if fmt not in ("npy", "csv"):
+            raise ValueError(f"Unknown dataset format: {fmt!r}")
+        self.shard_dir = shard_dir
+        self.csv_path = csv_path
+        self.fmt = fmt
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+
+        self._lock = threading.Lock()
+        self._buffers: dict[int, tuple[np.ndarray, int, float]] = {}
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self.dropped_rows = 0
+        self._seq = 0
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="training-logger", daemon=True
+        )
+        self._thread.start()
+
+    # ------------------------------------------------------------------------- #
+    # Producer side (request path)                                              #
+    # ------------------------------------------------------------------------- #
+    def log(self, board: np.ndarray, r: int, c: int, hit: bool) -> None:
+        """Queue one shot; never touches the disk."""
+        flat = board.ravel()
+        width = flat.size + 3
+        with self._lock:
+            if self._closed:
+                return
+            buf, used, started = self._buffers.get(width, (None, 0, 0.0))
+            if buf is None:
+                buf = np.empty((self.batch_rows, width), dtype=_row_dtype(width))
+                started = time.monotonic()
+            buf[used, :-3] = flat
+            buf[used, -3:] = (r, c, int(hit))
+            used += 1
+            if used == self.batch_rows:
+                self._enqueue(buf)
+                self._buffers.pop(width, None)
+            else:
+                self._buffers[width] = (buf, used, started)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """
+        Hand every partial buffer to the writer and wait up to *timeout*
+        seconds until it is on disk. Returns ``False`` if it timed out.
+        """
+        self._drain(max_age=0.0)
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 10.0) -> None:
+        if self._closed:
+            return
+        self.flush(timeout)
+        with self._lock:
+            self._closed = True
+            self._enqueue(None)
+        self._thread.join(timeout)
+
+    def _drain(self, max_age: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for width, (buf, used, started) in list(self._buffers.items()):
+                if now - started >= max_age:
+                    self._enqueue(buf[:used])
+                    del self._buffers[width]
+
+    def _enqueue(self, rows: np.ndarray | None) -> None:
+        """Queue *rows* for the writer, dropping the oldest buffer if it is full."""
+        while True:
+            try:
+                self._queue.put_nowait(rows)
+                return
+            except queue.Full:
+                pass
+            try:
+                oldest = self._queue.get_nowait()
+            except queue.Empty:
+                continue
+            self._queue.task_done()
+            if oldest is not None:
+                self.dropped_rows += len(oldest)
+                log.warning("Training log writer is behind; dropped %d rows", len(oldest))
+
+    # ------------------------------------------------------------------------- #
+    # Consumer side (background thread)                                         #
+    # ------------------------------------------------------------------------- #
+    def _run(self) -> None:
+        while True:
+            try:
+                rows = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._drain(max_age=self.flush_interval)
+                continue
+            try:
+                if rows is None:
+                    return
+                self._write(rows)
+            except Exception as exc:
+                with self._lock:
+                    self.dropped_rows += len(rows)
+                log.warning("Could not save %d training rows: %s", len(rows), exc)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, rows: np.ndarray) -> None:
+        if self.fmt == "csv" or rows.dtype != np.int8:
+            _append_csv(self.csv_path, rows)
+            return
+
+        os.makedirs(self.shard_dir, exist_ok=True)
+        self._seq += 1
+        name = f"part-{os.getpid()}-{time.time_ns()}-{self._seq:06d}.npy"
+        path = os.path.join(self.shard_dir, name)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, rows)
+        os.replace(tmp, path)
+
+
+def _row_dtype(width: int) -> type:
+    """int8 while row/col indices fit (boards up to 127×127), int32 beyond."""
+    n = int(round((width - 3) ** 0.5))
+    return np.int8 if n <= np.iinfo(np.int8).max else np.int32
+
+
+def _append_csv(path: str, rows: np.ndarray) -> None:
+    with open(path, "a", newline="") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            if f.tell() and not _ends_with_newline(path):
+                f.write("\n")  # e.g. a hand-edited file; keep its last row whole
+            csv.writer(f).writerows(rows.astype(int).tolist())
+            f.flush()
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+# ----------------------------------------------------------------------------- #
+# Process-wide logger                                                           #
+# ----------------------------------------------------------------------------- #
+_logger: TrainingLogger | None = None
+_logger_lock = threading.Lock()
+
+
+def get_logger() -> TrainingLogger:
+    """Return the shared logger, starting it on first use."""
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            fmt = os.environ.get("BATTLESHIPS_DATASET_FORMAT", "npy")
+            _logger = TrainingLogger(fmt=fmt)
+            atexit.register(_logger.close)
+        return _logger
+
+
+# ----------------------------------------------------------------------------- #
+# Readers                                                                       #
+# ----------------------------------------------------------------------------- #
+def shard_paths(shard_dir: str = SHARD_DIR) -> list[str]:
+    return sorted(glob.glob(os.path.join(shard_dir, "*.npy")))
+
+
+def load_rows(
+    csv_path: str = CSV_PATH, shard_dir: str = SHARD_DIR, width: int | None = None
+) -> np.ndarray:
+    """
+    Load every logged row – legacy CSV plus binary shards – as one int array.
+
+    Rows whose width differs from *width* (default: the first one found) are
+    skipped, since they come from a different board size.
+    """
+    parts = []
+    if os.path.exists(csv_path) and os.path.getsize(csv_path):
+        parts.append(np.loadtxt(csv_path, delimiter=",", dtype=np.int16, ndmin=2))
+    parts += [np.load(p) for p in shard_paths(shard_dir)]
+    if not parts:
+        raise FileNotFoundError(
+            "No dataset found. Play some games first to generate training data."
+        )
+    width = width or parts[0].shape[1]
+    return np.concatenate([p for p in parts if p.shape[1] == width]).astype(int)
+
+
+def iter_row_chunks(
+    csv_path: str = CSV_PATH,
+    shard_dir: str = SHARD_DIR,
+    width: int | None = None,
+    chunk_rows: int = 65_536,
+    shards: list[str] | None = None,
+) -> Iterator[np.ndarray]:
+    """
+    Stream logged rows in chunks of at most *chunk_rows* without loading
+    the whole dataset: the CSV is read incrementally and shards are
+    memory-mapped. Rows of another *width* are skipped as in :func:`load_rows`.
+    *shards* pins the shard files to read instead of listing *shard_dir*.
+    """
+    if os.path.exists(csv_path) and os.path.getsize(csv_path):
+        import pandas as pd
+
+        for frame in pd.read_csv(
+            csv_path, header=None, chunksize=chunk_rows, dtype=np.int16
+        ):
+            rows = frame.to_numpy()
+            width = width or rows.shape[1]
+            if rows.shape[1] == width:
+                yield rows
+
+    for path in (shard_paths(shard_dir) if shards is None else shards):
+        shard = np.load(path, mmap_mode="r")
+        width = width or shard.shape[1]
+        if shard.shape[1] != width:
+            continue
+        for start in range(0, shard.shape[0], chunk_rows):
+            yield np.asarray(shard[start:start + chunk_rows])
@@ -1,24 +1,129 @@
-# core/ml_model.py
+# ml/ml_model.py
+import logging
+import os
+import threading
+import time
+
 import numpy as np
-from tensorflow.keras.models import load_model
+from core.ai import get_computer_target
+from core.config import GameConfig
 
 MODEL_PATH = "ml/model.keras"
-_model = load_model(MODEL_PATH)
 
-def predict_target(board_flat: list[int]) -> tuple[int, int]:
+
+def model_path_for(grid_size: int) -> str:
+    """Model trained for *grid_size* boards; the 5×5 one keeps its original name."""
+    return MODEL_PATH if grid_size == 5 else f"ml/model-{grid_size}x{grid_size}.keras"
+
+
+# Latency target for one computer move (one batched forward pass).
+LATENCY_BUDGET_MS = 15.0
+last_latency_ms: float | None = None
+
+log = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------------- #
+# Model registry                                                                #
+# ----------------------------------------------------------------------------- #
+# path -> (mtime, model); TensorFlow is imported on the first load only.
+_models: dict[str, tuple[float, object]] = {}
+_models_lock = threading.Lock()
+
+
+def get_model(path: str = MODEL_PATH):
+    """
+    Return the model stored at *path*, or ``None`` if it cannot be used.
+
+    Models are loaded on first use and cached by path. The file's mtime is
+    checked on every call, so retraining ``ml/model.keras`` hot-reloads it.
+    A missing file or a missing TensorFlow install yields ``None``.
+    """
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    cached = _models.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _models_lock:
+        cached = _models.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        try:
+            from tensorflow.keras.models import load_model
+        except ImportError:
+            log.info("TensorFlow not installed; using core.ai targeting")
+            return None
+        try:
+            model = load_model(path)
+        except (OSError, ValueError) as exc:
+            log.warning("Could not load model %s: %s", path, exc)
+            return None
+        _models[path] = (mtime, model)
+        return model
+
+
+def candidate_batch(board_flat: list[int]) -> tuple[np.ndarray, np.ndarray]:
     """
-    Given a flat 5x5 board (25 ints), return the predicted (row, col) to fire at.
+    Build the model input for every unguessed cell in one array.
+
+    The trainer learns from rows logged *after* the shot was marked on the
+    board, so a candidate ``(r, c)`` is scored as the board with that cell
+    set to 1. Returns ``(candidates, batch)`` where *candidates* are flat
+    cell indices and *batch* has shape ``(len(candidates), N*N)``.
+    """
+    board = np.asarray(board_flat, dtype=np.float32)
+    candidates = np.flatnonzero(board == 0)
+    batch = np.repeat(board[None, :], candidates.size, axis=0)
+    batch[np.arange(candidates.size), candidates] = 1.0
+    return candidates, batch
+
+
+def predict_target(
+    board_flat: list[int],
+    computer_hits: list[tuple[int, int]] | None = None,
+    remaining_lengths: list[int] | None = None,
+    model_path: str | None = None,
+    config: GameConfig | None = None,
+) -> tuple[int, int]:
     """
-    # Try all cells not yet guessed and find the one with highest predicted score
-    best_score = -1
-    best_move = None
-    for r in range(5):
-        for c in range(5):
-            idx = r * 5 + c
-            if board_flat[idx] == 0:  # only try unguessed cells
-                sample = np.array([board_flat + [r, c]], dtype=np.float32)
-                score = _model.predict(sample, verbose=0)[0][0]
-                if score > best_score:
-                    best_score = score
-                    best_move = (r, c)
-    return best_move
+    Given a flat N×N board (N*N ints), return the predicted (row, col) to fire at.
+
+    All unguessed cells are scored in a single batched call of the model.
+    The model is picked by board size (see :func:`model_path_for`) unless
+    *model_path* is given. Without a usable model the move comes from
+    ``core.ai.get_computer_target``, which needs *remaining_lengths* or the
+    game's *config*.
+    """
+    global last_latency_ms
+
+    start = time.perf_counter()
+    n = int(round(len(board_flat) ** 0.5))
+    candidates, batch = candidate_batch(board_flat)
+    if candidates.size == 0:
+        return None
+
+    model = get_model(model_path or model_path_for(n))
+    if model is None:
+        return get_computer_target(
+            computer_hits or [],
+            np.asarray(board_flat, dtype=int).reshape(n, n),
+            n,
+            remaining_lengths=remaining_lengths,
+            config=config,
+        )
+
+    scores = np.asarray(model(batch, training=False)).reshape(-1)
+    best = int(candidates[int(np.argmax(scores))])
+
+    last_latency_ms = (time.perf_counter() - start) * 1000
+    if last_latency_ms > LATENCY_BUDGET_MS:
+        log.warning(
+            "predict_target took %.1f ms (budget %.1f ms)",
+            last_latency_ms,
+            LATENCY_BUDGET_MS,
+        )
+    return divmod(best, n)
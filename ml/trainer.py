@@ -1,51 +1,162 @@
+# ml/trainer.py
+# Run from the repository root: python -m ml.trainer
+#
+# Streams ml/dataset.csv and the binary shards in ml/shards/ through tf.data,
+# so memory stays bounded however large the logged dataset grows. With
+# --compact it reads the deduplicated file from ml/compact.py instead,
+# weighting each record by its trial count.
+import argparse
+import os
+
 import numpy as np
-import pandas as pd
+import tensorflow as tf
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Dense
-from tensorflow.keras.models import load_model
-from sklearn.model_selection import train_test_split
-import os
+from ml.compact import compact_path_for, iter_compact_chunks
+from ml.datalog import CSV_PATH, SHARD_DIR, iter_row_chunks
+from ml.ml_model import model_path_for
+
+CHECKPOINT_DIR = "ml/checkpoints"
+
+
+def row_width(grid_size: int) -> int:
+    # Rows are N*N flattened cells + row + col + hit (28 columns on a 5x5 board).
+    return grid_size * grid_size + 3
+
+
+# --- Deterministic train / validation split --------------------------------------
+def validation_mask(rows: np.ndarray, validation_split: float) -> np.ndarray:
+    """
+    Assign each row to validation by a hash of its contents (FNV-1a over the
+    columns). The split is stable across runs and chunkings, and equal rows
+    always land on the same side. Callers pass the board columns only.
+    """
+    h = np.full(rows.shape[0], 0xCBF29CE484222325, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for col in rows.T.astype(np.uint64):
+            h = (h ^ col) * np.uint64(0x100000001B3)
+    return (h % np.uint64(10_000)) < np.uint64(round(validation_split * 10_000))
+
+
+def make_dataset(
+    grid_size: int,
+    validation: bool,
+    validation_split: float,
+    batch_size: int,
+    shuffle_buffer: int,
+    seed: int,
+    csv_path: str = CSV_PATH,
+    shard_dir: str = SHARD_DIR,
+    compact_path: str | None = None,
+) -> tf.data.Dataset:
+    n_features = grid_size * grid_size
+
+    def generate():
+        for rows in iter_row_chunks(csv_path, shard_dir, width=row_width(grid_size)):
+            # Split by board, like the compact data, so both formats agree
+            # and no board appears on both sides.
+            board = rows[:, :n_features] != 0
+            keep = validation_mask(board, validation_split) == validation
+            rows = rows[keep]
+            # Features: the board only. Label: last column is hit or miss.
+            yield rows[:, :n_features].astype(np.float32), rows[:, -1].astype(np.float32)
+
+    def generate_compact():
+        for boards, hit_rate, trials in iter_compact_chunks(compact_path, grid_size):
+            # Split by board: it is the whole feature vector, so no board
+            # appears on both sides.
+            keep = validation_mask(boards, validation_split) == validation
+            # Label: hit rate of the record, weighted by how often it was seen.
+            yield (
+                boards[keep].astype(np.float32),
+                hit_rate[keep].astype(np.float32),
+                trials[keep].astype(np.float32),
+            )
+
+    signature = (
+        tf.TensorSpec(shape=(None, n_features), dtype=tf.float32),
+        tf.TensorSpec(shape=(None,), dtype=tf.float32),
+    )
+    if compact_path:
+        generate, signature = generate_compact, signature + (signature[1],)
+    dataset = tf.data.Dataset.from_generator(generate, output_signature=signature).unbatch()
+    if not validation:
+        dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+# --- Define a simple Deep Neural Network model -----------------------------------
+def build_model(n_features: int) -> Sequential:
+    model = Sequential([
+        Dense(64, activation='relu', input_shape=(n_features,)),
+        Dense(32, activation='relu'),
+        Dense(1, activation='sigmoid')  # Output layer for binary classification
+    ])
+    model.compile(
+        optimizer='adam',
+        loss='binary_crossentropy',
+        metrics=['accuracy']
+    )
+    return model
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Train the shot model.")
+    parser.add_argument("--grid-size", type=int, default=5)
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--shuffle-buffer", type=int, default=100_000)
+    parser.add_argument("--validation-split", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR)
+    parser.add_argument("--model-path", help="default: ml/model.keras for 5x5, ml/model-NxN.keras otherwise")
+    parser.add_argument(
+        "--compact",
+        nargs="?",
+        const="",
+        help="train on a compact dataset (default path: ml/dataset-NxN.npy)",
+    )
+    args = parser.parse_args(argv)
+
+    compact_path = None
+    if args.compact is not None:
+        compact_path = args.compact or compact_path_for(args.grid_size)
+        if not os.path.exists(compact_path):
+            raise FileNotFoundError(f"No compact dataset at {compact_path}. Run python -m ml.compact first.")
+    elif not os.path.exists(CSV_PATH) and not os.path.isdir(SHARD_DIR):
+        raise FileNotFoundError("No dataset found. Play some games first to generate training data.")
+
+    tf.random.set_seed(args.seed)
+    model_path = args.model_path or model_path_for(args.grid_size)
+    checkpoint_dir = os.path.join(args.checkpoint_dir, f"{args.grid_size}x{args.grid_size}")
+    train = make_dataset(
+        args.grid_size, False, args.validation_split, args.batch_size, args.shuffle_buffer, args.seed,
+        compact_path=compact_path,
+    )
+    val = make_dataset(
+        args.grid_size, True, args.validation_split, args.batch_size, args.shuffle_buffer, args.seed,
+        compact_path=compact_path,
+    )
+
+    model = build_model(args.grid_size * args.grid_size)
+
+    # --- Resumable training: an interrupted run continues from its last epoch ---
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    callbacks = [
+        tf.keras.callbacks.BackupAndRestore(os.path.join(checkpoint_dir, "backup")),
+        tf.keras.callbacks.ModelCheckpoint(
+            os.path.join(checkpoint_dir, "epoch-{epoch:03d}.keras")
+        ),
+    ]
+
+    # --- Train the model ---
+    print("Training model...")
+    model.fit(train, epochs=args.epochs, validation_data=val, callbacks=callbacks)
+
+    # --- Save the trained model ---
+    model.save(model_path)
+    print(f"Model saved to: {model_path}")
+
 
-# --- Load the dataset ---
-DATA_PATH = "ml/dataset.csv"
-
-if not os.path.exists(DATA_PATH):
-    raise FileNotFoundError("No dataset found. Play some games first to generate ml/dataset.csv.")
-
-# Assumes: 25 flattened cells + row + col + hit (total 28 columns)
-data = pd.read_csv(DATA_PATH, header=None)
-
-# --- Prepare features (X) and labels (y) ---
-X = data.iloc[:, :25].values  # only take the first 25
-y = data.iloc[:, 27].values   # last column is hit or miss
-
-# --- Split data into training and test sets ---
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-# --- Define a simple Deep Neural Network model ---
-model = Sequential([
-    Dense(64, activation='relu', input_shape=(25,)),
-    Dense(32, activation='relu'),
-    Dense(1, activation='sigmoid')  # Output layer for binary classification
-])
-
-model.compile(
-    optimizer='adam',
-    loss='binary_crossentropy',
-    metrics=['accuracy']
-)
-
-# --- Train the model ---
-print("Training model...")
-model.fit(
-    X_train,
-    y_train,
-    epochs=20,
-    batch_size=8,
-    validation_data=(X_test, y_test)
-)
-
-# --- Save the trained model ---
-MODEL_PATH = "ml/model.keras"
-model.save(MODEL_PATH)
-print(f"Model saved to: {MODEL_PATH}")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Round trips through ``Game.to_bytes`` / ``Game.from_bytes`` in every phase,
+and freezing and thawing games in the ``SessionManager``.
+
+Run from the repository root::
+
+    python -m pytest -q
+"""
+import numpy as np
+import pytest
+from core import engine
+from core.config import GameConfig
+from core.engine import Game, SessionManager
+
+# A vertical ship, a length-1 ship and a horizontal one, in that order.
+CONFIG = GameConfig(6, (3, 1, 2))
+PLAYER_SHIPS = [[(0, 0), (1, 0), (2, 0)], [(5, 5)], [(3, 2), (3, 3)]]
+
+
+def placed_game(seed=7):
+    game = engine.new_game(CONFIG, seed)
+    for cells in PLAYER_SHIPS:
+        engine.place(game, cells)
+    return game
+
+
+def game_in_phase(phase):
+    if phase == "placing":
+        game = engine.new_game(CONFIG, 7)
+        engine.place(game, PLAYER_SHIPS[0])
+        return game
+
+    game = placed_game()
+    if phase == "won":
+        for r, c in [cell for ship in game.opponent.ships() for cell in ship]:
+            engine.fire(game, r, c)
+    elif phase == "lost":
+        while game.phase == "playing":
+            engine.computer_turn(game)
+    else:
+        # Sink the length-1 ship and hit the vertical one, so some hits are
+        # pruned and some stay live.
+        for cell in [(5, 5), (0, 0), (4, 4), (1, 0), (2, 2)]:
+            engine.computer_turn(game, cell)
+        r, c = np.argwhere(game.opponent.fleet_array() == 0)[0]
+        engine.fire(game, int(r), int(c))  # a player miss
+    assert game.phase == phase
+    return game
+
+
+def assert_same_game(a: Game, b: Game):
+    assert (a.config, a.phase, a.seed) == (b.config, b.phase, b.seed)
+    for side_a, side_b in ((a.player, b.player), (a.opponent, b.opponent)):
+        assert side_a.ship_masks == side_b.ship_masks
+        assert side_a.shots == side_b.shots
+    np.testing.assert_array_equal(a.computer_guesses, b.computer_guesses)
+    assert set(a.computer_hits) == set(b.computer_hits)
+    remaining = a.player.remaining_lengths()
+    np.testing.assert_array_equal(
+        a.targeting.probability_grid(remaining), b.targeting.probability_grid(remaining)
+    )
+
+
+@pytest.mark.parametrize("phase", ["placing", "playing", "won", "lost"])
+def test_round_trip(phase):
+    game = game_in_phase(phase)
+    restored = Game.from_bytes(game.to_bytes())
+    assert_same_game(game, restored)
+    assert restored.to_bytes() == game.to_bytes()
+
+
+def test_playing_game_keeps_its_live_hits():
+    game = game_in_phase("playing")
+    assert set(game.computer_hits) == {(0, 0), (1, 0)}  # (5, 5) was sunk
+    assert set(Game.from_bytes(game.to_bytes()).computer_hits) == {(0, 0), (1, 0)}
+
+
+def test_restored_game_plays_on_identically():
+    game = game_in_phase("playing")
+    restored = Game.from_bytes(game.to_bytes())
+    while game.phase == "playing":
+        assert engine.computer_turn(game) == engine.computer_turn(restored)
+    assert_same_game(game, restored)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_session_manager_freezes_least_recently_used():
+    sessions = SessionManager(max_active=2, idle_seconds=1e9, clock=FakeClock())
+    first = sessions.create(CONFIG, seed=1)
+    engine.place(sessions.get(first), PLAYER_SHIPS[0])
+    before = sessions.get(first).to_bytes()
+    second = sessions.create(CONFIG, seed=2)
+    sessions.create(CONFIG, seed=3)
+    assert sessions.stats()["active"] == 2
+    assert sessions.stats()["frozen"] == 1
+
+    restored = sessions.get(first)  # thaws *first*, freezes *second*
+    assert restored.to_bytes() == before
+    assert sessions.stats()["active"] == 2
+    assert sessions.get(second).seed == 2
+
+
+def test_session_manager_freezes_idle_games():
+    clock = FakeClock()
+    sessions = SessionManager(max_active=10, idle_seconds=60, clock=clock)
+    game_id = sessions.create(CONFIG, seed=1)
+    for cells in PLAYER_SHIPS:
+        engine.place(sessions.get(game_id), cells)
+    engine.computer_turn(sessions.get(game_id), (0, 0))
+    before = sessions.get(game_id).to_bytes()
+
+    clock.now = 59
+    sessions.evict_idle()
+    assert sessions.stats()["frozen"] == 0
+    clock.now = 60
+    sessions.evict_idle()
+    assert sessions.stats() == {
+        "active": 0, "frozen": 1, "frozen_bytes": len(before),
+    }
+
+    restored = sessions.get(game_id)
+    assert restored.to_bytes() == before
+    assert restored.computer_hits == [(0, 0)]
+    assert sessions.stats()["active"] == 1
+
+
+def test_session_manager_drop_and_unknown_ids():
+    sessions = SessionManager(max_active=1, clock=FakeClock())
+    game_id = sessions.create(CONFIG)
+    sessions.create(CONFIG)
+    sessions.drop(game_id)
+    with pytest.raises(KeyError):
+        sessions.get(game_id)
+    assert sessions.stats()["active"] + sessions.stats()["frozen"] == 1
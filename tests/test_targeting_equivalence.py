@@ -0,0 +1,106 @@
+"""
+Randomized checks that every targeting engine matches the reference
+``_build_probability_grid`` loops, and that the opening book does not
+change the computer's picks.
+
+Run from the repository root::
+
+    python -m pytest -q
+"""
+import random
+
+import numpy as np
+import pytest
+from core import engine
+from core.ai import (
+    _build_probability_grid,
+    _build_probability_grid_np,
+    batch_probability_grids,
+    get_computer_target,
+)
+from core.config import PRESETS
+from core.game_logic import sample_fleet
+from core.opening_book import OpeningBook
+
+CONFIGS = [PRESETS["Classic 5×5"], PRESETS["10×10 standard fleet"]]
+
+
+def played_positions(config, seed):
+    """
+    Play one game with the computer firing at a random player fleet and
+    yield ``(game, remaining_lengths)`` before every computer shot.
+    """
+    game = engine.new_game(config, seed)
+    n = config.grid_size
+    for cells in sample_fleet(config, np.random.default_rng(seed)):
+        engine.place(game, [divmod(int(i), n) for i in cells])
+    while game.phase == "playing":
+        yield game, game.player.remaining_lengths()
+        engine.computer_turn(game, engine="numpy")
+
+
+def random_board(n, rng):
+    """Random guesses with some of them marked as live hits (not necessarily consistent)."""
+    guesses = (rng.random((n, n)) < rng.uniform(0.05, 0.6)).astype(int)
+    hits = [tuple(map(int, rc)) for rc in np.argwhere(guesses == 1) if rng.random() < 0.15]
+    return guesses, hits
+
+
+@pytest.mark.parametrize("config", CONFIGS, ids=lambda c: f"{c.grid_size}x{c.grid_size}")
+@pytest.mark.parametrize("seed", range(5))
+def test_numpy_grid_matches_reference(config, seed):
+    rng = np.random.default_rng(seed)
+    n = config.grid_size
+    for _ in range(20):
+        guesses, hits = random_board(n, rng)
+        fleet = [int(x) for x in rng.choice(config.ship_lengths, size=rng.integers(1, 6))]
+        np.testing.assert_array_equal(
+            _build_probability_grid_np(guesses, hits, fleet),
+            _build_probability_grid(guesses, hits, fleet),
+        )
+
+
+@pytest.mark.parametrize("config", CONFIGS, ids=lambda c: f"{c.grid_size}x{c.grid_size}")
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_state_matches_reference_over_a_game(config, seed):
+    for game, remaining in played_positions(config, seed):
+        np.testing.assert_array_equal(
+            game.targeting.probability_grid(remaining),
+            _build_probability_grid(game.computer_guesses, game.computer_hits, remaining),
+        )
+
+
+@pytest.mark.parametrize("config", CONFIGS, ids=lambda c: f"{c.grid_size}x{c.grid_size}")
+def test_batch_grids_match_numpy(config):
+    n = config.grid_size
+    boards, hit_masks, fleets = [], [], []
+    for seed in range(4):
+        for game, remaining in played_positions(config, seed):
+            hits = np.zeros((n, n), dtype=bool)
+            for r, c in game.computer_hits:
+                hits[r, c] = True
+            boards.append(game.computer_guesses.copy())
+            hit_masks.append(hits)
+            fleets.append(remaining)
+
+    grids = batch_probability_grids(np.stack(boards), np.stack(hit_masks), fleets)
+    for guesses, hits, fleet, grid in zip(boards, hit_masks, fleets, grids):
+        hit_cells = [tuple(map(int, rc)) for rc in np.argwhere(hits)]
+        np.testing.assert_array_equal(grid, _build_probability_grid_np(guesses, hit_cells, fleet))
+
+
+@pytest.mark.parametrize("config", CONFIGS, ids=lambda c: f"{c.grid_size}x{c.grid_size}")
+@pytest.mark.parametrize("seed", range(5))
+def test_opening_book_picks_match_heuristic(config, seed):
+    rng = np.random.default_rng(seed)
+    n = config.grid_size
+    book = OpeningBook()
+    for move in range(30):
+        misses = (rng.random((n, n)) < rng.uniform(0, 0.5)).astype(int)
+        count = rng.integers(1, len(config.ship_lengths) + 1)
+        fleet = [int(x) for x in rng.permutation(config.ship_lengths)[:count]]
+        with_book = get_computer_target(
+            [], misses, remaining_lengths=fleet, book=book, rng=random.Random(move)
+        )
+        without = get_computer_target([], misses, remaining_lengths=fleet, rng=random.Random(move))
+        assert with_book == without